@@ -0,0 +1,77 @@
+"""
+Minimal A2A JSON-RPC client for talking to the agent servers in agent_registry.
+"""
+import uuid
+from typing import Any, Optional
+
+import httpx
+
+from agent_registry import registry
+
+A2A_REQUEST_TIMEOUT = 120.0
+
+
+def agent_url(name: str) -> str:
+    return f'http://localhost:{registry[name]["PORT"]}/'
+
+
+def build_send_message(text: str, method: str = "message/send", metadata: Optional[dict] = None) -> dict:
+    message = {
+        "role": "user",
+        "parts": [{"kind": "text", "text": text}],
+        "messageId": uuid.uuid4().hex,
+    }
+    if metadata:
+        message["metadata"] = metadata
+    return {
+        "jsonrpc": "2.0",
+        "id": uuid.uuid4().hex,
+        "method": method,
+        "params": {"message": message},
+    }
+
+
+def _join_parts(parts: list) -> str:
+    return "".join(p.get("text", "") for p in parts)
+
+
+def extract_text(result: dict) -> str:
+    """
+    Collects the text of a Task or Message returned by an A2A server.
+
+    A task's answer is read from its artifacts. Streamed artifacts arrive as
+    many text parts that are joined back together. The status message is only
+    used when no artifact has text.
+    """
+    if result.get("kind") == "message":
+        return _join_parts(result.get("parts", []))
+    texts = [_join_parts(artifact.get("parts", [])) for artifact in result.get("artifacts") or []]
+    text = "\n".join(t for t in texts if t)
+    if text:
+        return text
+    status_message = (result.get("status") or {}).get("message") or {}
+    return _join_parts(status_message.get("parts", []))
+
+
+async def send_message(
+    url: str,
+    text: str,
+    client: Optional[httpx.AsyncClient] = None,
+    metadata: Optional[dict] = None,
+) -> dict[str, Any]:
+    """
+    Sends a single text message (with optional message metadata) to an A2A
+    server and returns the JSON-RPC result.
+
+    Raises:
+        RuntimeError: If the server answers with a JSON-RPC error.
+    """
+    if client is None:
+        async with httpx.AsyncClient(timeout=A2A_REQUEST_TIMEOUT) as client:
+            return await send_message(url, text, client, metadata)
+    res = await client.post(url, json=build_send_message(text, metadata=metadata))
+    res.raise_for_status()
+    body = res.json()
+    if "error" in body:
+        raise RuntimeError(f"A2A error from {url}: {body['error']}")
+    return body["result"]
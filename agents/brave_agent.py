@@ -14,7 +14,7 @@ if os.getenv("BRAVE_API_KEY"):
     )
 
 brave_agent = Agent(
-    get_model(),
+    get_model(agent_name='brave'),
     system_prompt="You are a web search specialist using Brave Search. Find relevant information on the web.",
     mcp_servers=[brave_server] if brave_server else []
 )
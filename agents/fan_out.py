@@ -0,0 +1,153 @@
+"""
+Planning and concurrent execution of composite requests across sub-agents.
+
+A planner model splits the request into sub-tasks, each bound to one agent and
+listing the sub-tasks whose output it needs. Every sub-task starts as soon as
+its dependencies finish, so independent work runs concurrently and the total
+latency tracks the slowest dependency chain rather than the sum of all tasks.
+"""
+import asyncio
+from typing import Dict, List, Literal
+
+from pydantic import BaseModel, Field
+from pydantic_ai import Agent, ModelRetry
+from pydantic_ai.exceptions import UsageLimitExceeded
+
+from .a2a_client import agent_url, extract_text, send_message
+from .brave_agent import brave_agent, brave_server
+from .filesystem_agent import filesystem_agent
+from .github_agent import github_agent, github_server
+from .shared import get_model
+from .usage_accounting import merge_remote_usage, remaining_budget
+
+AgentName = Literal["brave", "github", "filesystem", "supabase"]
+
+
+class SubTask(BaseModel):
+    id: str = Field(description="Short unique identifier, e.g. 'search' or 'store'.")
+    agent: AgentName
+    instruction: str = Field(description="Self-contained instruction for the agent.")
+    depends_on: List[str] = Field(default_factory=list, description="Ids of sub-tasks whose output this one needs.")
+
+
+class TaskPlan(BaseModel):
+    tasks: List[SubTask]
+
+
+class SubTaskResult(BaseModel):
+    id: str
+    agent: str
+    success: bool
+    output: str
+
+
+planner = Agent(
+    get_model(agent_name='fan_out_planner'),
+    output_type=TaskPlan,
+    system_prompt="""Break the user request into the smallest set of sub-tasks, each handled by one agent:
+    - brave: searches the web
+    - github: reads and changes GitHub repositories, issues and pull requests
+    - filesystem: reads and writes local files
+    - supabase: all database operations (create, read, update tables and rows)
+    Only add a dependency when a sub-task needs another sub-task's output; everything else runs in parallel.""",
+)
+
+
+async def _run_local(agent: Agent, instruction: str) -> str:
+    result = await agent.run(instruction)
+    return str(result.output)
+
+
+async def _run_supabase(instruction: str) -> str:
+    # The remote run is held to what is left of this request's budget.
+    metadata = {"usage_budget": remaining_budget()}
+    result = await send_message(agent_url("Supabase Agent"), instruction, metadata=metadata)
+    status = result.get("status") or {}
+    status_message = status.get("message") or {}
+    merge_remote_usage((status_message.get("metadata") or {}).get("usage"))
+    # A failed run still comes back as a task; its status message holds the error.
+    if result.get("kind") == "task" and status.get("state") != "completed":
+        raise RuntimeError(f"Supabase agent task {status.get('state')}: {extract_text(result)}")
+    return extract_text(result)
+
+
+def _runner(agent: str):
+    if agent == "brave" and brave_server:
+        return lambda instruction: _run_local(brave_agent, instruction)
+    if agent == "github" and github_server:
+        return lambda instruction: _run_local(github_agent, instruction)
+    if agent == "filesystem":
+        return lambda instruction: _run_local(filesystem_agent, instruction)
+    if agent == "supabase":
+        return _run_supabase
+    return None
+
+
+def _check_plan(plan: TaskPlan) -> None:
+    """Raises ModelRetry, so the planner is asked to fix a plan that cannot be scheduled."""
+    ids = [task.id for task in plan.tasks]
+    if len(ids) != len(set(ids)):
+        raise ModelRetry(f"Duplicate sub-task ids in plan: {ids}")
+    deps = {task.id: set(task.depends_on) for task in plan.tasks}
+    for task_id, task_deps in deps.items():
+        unknown = task_deps - deps.keys()
+        if unknown:
+            raise ModelRetry(f"Sub-task {task_id} depends on unknown sub-tasks {sorted(unknown)}")
+    # Kahn's algorithm: whatever cannot be ordered is part of a cycle.
+    remaining = dict(deps)
+    while remaining:
+        ready = [t for t, d in remaining.items() if not d & remaining.keys()]
+        if not ready:
+            raise ModelRetry(f"Dependency cycle between sub-tasks {sorted(remaining)}")
+        for t in ready:
+            del remaining[t]
+
+
+@planner.output_validator
+def validate_plan(plan: TaskPlan) -> TaskPlan:
+    _check_plan(plan)
+    return plan
+
+
+async def execute_plan(plan: TaskPlan) -> List[SubTaskResult]:
+    """Runs every sub-task as soon as its dependencies have finished."""
+    _check_plan(plan)
+    futures: Dict[str, asyncio.Task] = {}
+
+    async def run(task: SubTask) -> SubTaskResult:
+        upstream = [await futures[dep] for dep in task.depends_on]
+        failed = [r.id for r in upstream if not r.success]
+        if failed:
+            return SubTaskResult(id=task.id, agent=task.agent, success=False, output=f"Skipped: dependencies {failed} failed")
+        instruction = task.instruction
+        if upstream:
+            context = "\n\n".join(f"Output of {r.id} ({r.agent}):\n{r.output}" for r in upstream)
+            instruction = f"{instruction}\n\n{context}"
+        runner = _runner(task.agent)
+        if runner is None:
+            return SubTaskResult(id=task.id, agent=task.agent, success=False, output=f"Agent {task.agent} is not available")
+        print(f"Fan-out: starting {task.id} on {task.agent}")
+        try:
+            output = await runner(instruction)
+        except UsageLimitExceeded:
+            # The request's budget is spent; that ends the whole request, not just this sub-task.
+            raise
+        except Exception as e:
+            return SubTaskResult(id=task.id, agent=task.agent, success=False, output=f"Error: {e}")
+        return SubTaskResult(id=task.id, agent=task.agent, success=True, output=output)
+
+    for task in plan.tasks:
+        futures[task.id] = asyncio.create_task(run(task))
+    try:
+        return list(await asyncio.gather(*futures.values()))
+    except BaseException:
+        for future in futures.values():
+            future.cancel()
+        raise
+
+
+async def plan_and_execute(request: str) -> List[SubTaskResult]:
+    """Plans a composite request and runs its sub-tasks concurrently."""
+    plan = (await planner.run(request)).output
+    print(f"Fan-out plan: {plan}")
+    return await execute_plan(plan)
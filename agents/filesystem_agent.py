@@ -11,7 +11,7 @@ filesystem_server = MCPServerStdio(
 )
 
 filesystem_agent = Agent(
-    get_model(),
+    get_model(agent_name='filesystem'),
     system_prompt="You are a filesystem specialist. Help users manage their files and directories.",
     mcp_servers=[filesystem_server]
 )
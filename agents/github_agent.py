@@ -14,7 +14,7 @@ if os.getenv("GITHUB_TOKEN"):
     )
 
 github_agent = Agent(
-    get_model(),
+    get_model(agent_name='github'),
     system_prompt="You are a GitHub specialist. Help users interact with GitHub repositories and features.",
     mcp_servers=[github_server] if github_server else []
 )
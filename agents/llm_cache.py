@@ -0,0 +1,176 @@
+"""
+Persistent cache for deterministic LLM calls.
+
+Agents opt in with ``get_model(cache=True)``. Requests are keyed on the model
+name, the system prompt, the message history and the tool schema; responses are
+stored in SQLite with a TTL and a size bound (least recently used rows are
+evicted first). The database is only opened on the first cached request.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import asdict
+from typing import Any, Optional
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, ModelMessagesTypeAdapter
+from pydantic_ai.models import Model, ModelRequestParameters
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import Usage
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# Attributes that vary per call without changing the meaning of a message part.
+_VOLATILE_PART_FIELDS = {"timestamp", "tool_call_id"}
+
+
+class LLMCache:
+    """SQLite-backed store of model responses with TTL and size-based eviction."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response BLOB NOT NULL,
+                total_tokens INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        model_name: str,
+        messages: list[ModelMessage],
+        model_request_parameters: ModelRequestParameters,
+    ) -> str:
+        history = []
+        for message in messages:
+            parts = []
+            for part in message.parts:
+                fields = {k: v for k, v in vars(part).items() if k not in _VOLATILE_PART_FIELDS}
+                parts.append(fields)
+            history.append({"kind": message.kind, "parts": parts})
+        tools = [
+            asdict(tool)
+            for tool in [*model_request_parameters.function_tools, *model_request_parameters.output_tools]
+        ]
+        payload = json.dumps(
+            {
+                "model": model_name,
+                "messages": history,
+                "tools": tools,
+                "allow_text_output": model_request_parameters.allow_text_output,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[ModelResponse]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, total_tokens, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_tokens += row[1]
+        return ModelMessagesTypeAdapter.validate_json(row[0])[0]
+
+    def set(self, key: str, model_name: str, response: ModelResponse, usage: Usage) -> None:
+        now = time.time()
+        blob = ModelMessagesTypeAdapter.dump_json([response])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, blob, usage.total_tokens or 0, now, now),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_tokens": self.saved_tokens,
+            "entries": entries,
+        }
+
+
+class CachedModel(WrapperModel):
+    """Model wrapper that answers repeated requests from an ``LLMCache``."""
+
+    def __init__(self, wrapped: Model, cache: Optional[LLMCache] = None):
+        super().__init__(wrapped)
+        self._cache = cache
+
+    @property
+    def cache(self) -> LLMCache:
+        # Resolved lazily so that building an agent at import time doesn't create the cache file.
+        if self._cache is None:
+            self._cache = get_llm_cache()
+        return self._cache
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> tuple[ModelResponse, Usage]:
+        key = self.cache.make_key(self.model_name, messages, model_request_parameters)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached, Usage()
+        response, usage = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        self.cache.set(key, self.model_name, response, usage)
+        return response, usage
+
+
+_llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
+
+
+def get_cache_stats() -> dict[str, Any]:
+    """Hit/miss and saved-token counters for the shared LLM cache."""
+    if _llm_cache is None:
+        return {"hits": 0, "misses": 0, "hit_rate": 0.0, "saved_tokens": 0, "entries": 0}
+    return _llm_cache.stats()
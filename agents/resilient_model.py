@@ -0,0 +1,182 @@
+"""
+Deadline, hedging and fallback policy for LLM calls.
+
+Each request goes to the configured models in order. An attempt that outlives
+the observed latency percentile of its endpoint is hedged with a second
+attempt (on the next model if there is one) and the first success wins. An
+attempt that fails or misses its deadline falls through to the next model.
+Streamed requests get the same deadline and fallback for opening the stream.
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import Usage
+
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "500"))
+
+
+class LatencyHistogram:
+    """Sliding window of recent call latencies for one endpoint."""
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> dict:
+        return {
+            "samples": len(self),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+# Shared across agents so every caller of an endpoint feeds the same histogram.
+_histograms: dict[str, LatencyHistogram] = {}
+
+
+def endpoint_label(model: Model) -> str:
+    return f"{model.model_name}@{getattr(model, 'base_url', model.system)}"
+
+
+def get_histogram(model: Model) -> LatencyHistogram:
+    label = endpoint_label(model)
+    if label not in _histograms:
+        _histograms[label] = LatencyHistogram()
+    return _histograms[label]
+
+
+def latency_stats() -> dict[str, dict]:
+    """Observed latency percentiles per model endpoint."""
+    return {label: histogram.summary() for label, histogram in _histograms.items()}
+
+
+class ResilientModel(WrapperModel):
+    """Wraps a primary model with fallbacks, per-attempt deadlines and hedged requests."""
+
+    def __init__(
+        self,
+        wrapped: Model,
+        fallbacks: Optional[list[Model]] = None,
+        deadline: float = LLM_DEADLINE_SECONDS,
+        hedge_percentile: Optional[float] = LLM_HEDGE_PERCENTILE,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+    ):
+        super().__init__(wrapped)
+        self.models = [wrapped, *(fallbacks or [])]
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+
+    def hedge_delay(self, model: Model) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data."""
+        histogram = get_histogram(model)
+        if not self.hedge_percentile or len(histogram) < self.hedge_min_samples:
+            return None
+        return histogram.percentile(self.hedge_percentile)
+
+    async def _timed_request(self, model: Model, *args, record_cancelled: bool = False) -> tuple[ModelResponse, Usage]:
+        started = time.monotonic()
+        try:
+            result = await model.request(*args)
+        except asyncio.CancelledError:
+            # A primary attempt cut off by a hedge win or the deadline took at least
+            # this long; leaving it out would bias the percentile towards fast calls.
+            # A cancelled hedge may have started just before the primary won, so its
+            # elapsed time says nothing about latency and is never recorded.
+            if record_cancelled:
+                get_histogram(model).record(time.monotonic() - started)
+            raise
+        get_histogram(model).record(time.monotonic() - started)
+        return result
+
+    async def _hedged_request(self, index: int, *args) -> tuple[ModelResponse, Usage]:
+        model = self.models[index]
+        first = asyncio.create_task(self._timed_request(model, *args, record_cancelled=True))
+        tasks = {first}
+        try:
+            delay = self.hedge_delay(model)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    hedge_model = self.models[index + 1] if index + 1 < len(self.models) else model
+                    print(f"LLM call to {endpoint_label(model)} exceeded {delay:.2f}s, hedging on {endpoint_label(hedge_model)}")
+                    tasks.add(asyncio.create_task(self._timed_request(hedge_model, *args)))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> tuple[ModelResponse, Usage]:
+        last_error = None
+        for index, model in enumerate(self.models):
+            try:
+                return await asyncio.wait_for(
+                    self._hedged_request(index, messages, model_settings, model_request_parameters),
+                    timeout=self.deadline,
+                )
+            except Exception as e:
+                last_error = e
+                print(f"LLM call to {endpoint_label(model)} failed ({type(e).__name__}: {e}), trying next model")
+        raise last_error
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> AsyncIterator[StreamedResponse]:
+        last_error = None
+        for model in self.models:
+            stack = AsyncExitStack()
+            try:
+                # Opening the stream waits for the first response chunk, which is
+                # where a stalled endpoint shows up.
+                async with asyncio.timeout(self.deadline):
+                    stream = await stack.enter_async_context(
+                        model.request_stream(messages, model_settings, model_request_parameters)
+                    )
+            except Exception as e:
+                await stack.aclose()
+                last_error = e
+                print(f"LLM stream from {endpoint_label(model)} failed ({type(e).__name__}: {e}), trying next model")
+                continue
+            async with stack:
+                yield stream
+            return
+        raise last_error
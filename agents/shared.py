@@ -1,14 +1,59 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from pydantic_ai.providers.openai import OpenAIProvider
 from pydantic_ai.models.openai import OpenAIModel
 
+from .resilient_model import ResilientModel
+from .usage_accounting import MeteredModel
+
 load_dotenv()
 
-def get_model():
-    """Get the configured model for agents."""
+@lru_cache(maxsize=None)
+def get_provider(base_url: str, api_key: str) -> OpenAIProvider:
+    """One provider per endpoint, so every agent shares its HTTP connection pool."""
+    return OpenAIProvider(base_url=base_url, api_key=api_key)
+
+def get_main_provider() -> OpenAIProvider:
+    base_url = os.getenv('MAIN_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta/openai')
+    api_key = os.getenv('OPENAI_API_KEY', 'no-api-key-provided')
+    return get_provider(base_url, api_key)
+
+def _build_model(model_name: str, base_url: str, api_key: str) -> OpenAIModel:
+    return OpenAIModel(model_name, provider=get_provider(base_url, api_key))
+
+def get_fallback_models(base_url: str, api_key: str) -> list[OpenAIModel]:
+    """Build the fallback models listed in FALLBACK_MODELS.
+
+    The variable is a comma-separated list of ``model`` or ``model@base_url``
+    entries, tried in order after the main model. FALLBACK_API_KEYS is an
+    optional comma-separated list of API keys in the same order, for fallbacks
+    on other providers; an entry left empty (or missing) uses the main key.
+    """
+    keys = os.getenv('FALLBACK_API_KEYS', '').split(',')
+    fallbacks = []
+    for position, entry in enumerate(os.getenv('FALLBACK_MODELS', '').split(',')):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, url = entry.partition('@')
+        key = keys[position].strip() if position < len(keys) else ''
+        fallbacks.append(_build_model(name, url or base_url, key or api_key))
+    return fallbacks
+
+def get_model(cache: bool = False, agent_name: str = 'default'):
+    """Get the configured model for agents.
+
+    Pass ``cache=True`` for agents whose prompts are deterministic enough that
+    repeated calls can be answered from the persistent LLM cache. ``agent_name``
+    labels the agent's token usage in the per-agent rollups.
+    """
     model_name = os.getenv('MAIN_MODEL', 'gpt-3.5-turbo')
     base_url = os.getenv('MAIN_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta/openai')
     api_key = os.getenv('OPENAI_API_KEY', 'no-api-key-provided')
-    model = OpenAIModel(model_name, provider=OpenAIProvider(base_url=base_url, api_key=api_key))
-    return model
+    model = ResilientModel(_build_model(model_name, base_url, api_key), get_fallback_models(base_url, api_key))
+    if cache:
+        from .llm_cache import CachedModel
+        model = CachedModel(model)
+    return MeteredModel(model, agent_name)
+
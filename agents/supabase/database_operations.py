@@ -1,24 +1,32 @@
 """
 Database operations for DatabaseAgent: category persistence, insert/upsert, fetch, and schema commands.
 """
+import asyncio
 from typing import Dict, Any, Optional
-from .supabase_client import get_supabase_client
+from .supabase_client import run_query
 from .category_classifier import classify_category
 from .schema_inspector import fetch_table_schema
-from models.model_generator import get_or_create_model, clear_model_cache
+from .write_behind import SUPABASE_WRITE_BEHIND, get_write_behind_queue
+from models.model_generator import get_or_create_model, invalidate_models
 
 # --- Category Persistence ---
-def category_exists(category: str) -> bool:
-    supabase = get_supabase_client()
-    res = supabase.table("categories").select("name").eq("name", category).execute()
+async def fetch_categories() -> list:
+    res = await run_query(lambda db: db.table("categories").select("name").execute(), retry=True)
+    return [row["name"] for row in res.data] if res.data else []
+
+async def category_exists(category: str) -> bool:
+    res = await run_query(lambda db: db.table("categories").select("name").eq("name", category).execute(), retry=True)
     return bool(res.data)
 
-def insert_category(category: str) -> None:
-    supabase = get_supabase_client()
-    supabase.table("categories").insert({"name": category}).execute()
+async def insert_category(category: str) -> None:
+    await run_query(lambda db: db.table("categories").insert({"name": category}).execute())
+
+async def ensure_category(category: str, existing: list) -> None:
+    if category not in existing and not await category_exists(category):
+        await insert_category(category)
 
 # --- Insert/Upsert Handler ---
-def handle_insert(table_name: str, data: dict, schema_changes: bool = False) -> dict:
+async def handle_insert(table_name: str, data: dict, schema_changes: bool = False) -> dict:
     schema = fetch_table_schema(table_name)
     model = get_or_create_model(table_name, schema)
     try:
@@ -26,53 +34,107 @@ def handle_insert(table_name: str, data: dict, schema_changes: bool = False) ->
     except Exception as e:
         return {"success": False, "message": "Validation error", "data": None, "error": {"code": "validation_error", "detail": str(e)}}
     # Category classification
-    if "category" in data:
-        category = data["category"]
-    else:
-        # Fetch existing categories
-        supabase = get_supabase_client()
-        cat_res = supabase.table("categories").select("name").execute()
-        existing = [row["name"] for row in cat_res.data] if cat_res.data else []
-        category = classify_category(data, existing)
-        if not category_exists(category):
-            insert_category(category)
+    pending = []
+    if "category" not in data:
+        existing = await fetch_categories()
+        category = await classify_category(data, existing)
         data["category"] = category
+        # Persisting the category is independent of the row upsert, so both go out together.
+        pending.append(ensure_category(category, existing))
     # Upsert
-    supabase = get_supabase_client()
-    upsert_res = supabase.table(table_name).upsert(data).execute()
+    if SUPABASE_WRITE_BEHIND:
+        queued = get_write_behind_queue().enqueue(table_name, data)
+        write_id, *_ = await asyncio.gather(queued, *pending)
+        return {"success": True, "message": "Queued", "data": {"write_id": write_id, "status": "pending"}, "error": None}
+    # Without an id the upsert inserts a new row, so a retry after a timeout could duplicate it.
+    upsert = run_query(lambda db: db.table(table_name).upsert(data).execute(), retry="id" in data)
+    upsert_res, *_ = await asyncio.gather(upsert, *pending)
     return {"success": True, "message": "Inserted", "data": upsert_res.data, "error": None}
 
 # --- Fetch/List Handler ---
-def handle_fetch(table_name: str, filters: Optional[dict] = None) -> dict:
-    supabase = get_supabase_client()
-    query = supabase.table(table_name).select("*")
-    if filters:
-        for k, v in filters.items():
-            query = query.eq(k, v)
-    res = query.execute()
+async def handle_fetch(table_name: str, filters: Optional[dict] = None) -> dict:
+    def build(db):
+        query = db.table(table_name).select("*")
+        if filters:
+            for k, v in filters.items():
+                query = query.eq(k, v)
+        return query.execute()
+    res = await run_query(build, retry=True)
     return {"success": True, "message": "Fetched", "data": res.data or [], "error": None}
 
 # --- Schema Command Handler ---
-def handle_schema_command(command: dict) -> dict:
-    supabase = get_supabase_client()
+class UnknownSchemaCommand(ValueError):
+    pass
+
+def plan_schema_command(command: dict) -> tuple:
+    """Returns (table, sql, success message) for a single schema command."""
+    if command.get("type") == "add_column":
+        table = command["table"]
+        column = command["column"]
+        data_type = command["data_type"]
+        return table, f"ALTER TABLE {table} ADD COLUMN {column} {data_type};", f"Added column {column} to {table}."
+    elif command.get("type") == "create_table":
+        table = command["table"]
+        columns = command["columns"] # list of dicts: [{"name":..., "type":...}]
+        cols_sql = ", ".join([f'{c["name"]} {c["type"]}' for c in columns])
+        return table, f"CREATE TABLE {table} ({cols_sql});", f"Created table {table}."
+    raise UnknownSchemaCommand(str(command))
+
+async def handle_schema_command(command: dict) -> dict:
+    try:
+        table, sql, message = plan_schema_command(command)
+    except UnknownSchemaCommand as e:
+        return {"success": False, "message": "Unknown command type", "data": None, "error": {"code": "unknown_command", "detail": str(e)}}
+    except Exception as e:
+        return {"success": False, "message": "Schema command failed", "data": None, "error": {"code": "schema_error", "detail": str(e)}}
     try:
-        if command.get("type") == "add_column":
-            table = command["table"]
-            column = command["column"]
-            data_type = command["data_type"]
-            sql = f"ALTER TABLE {table} ADD COLUMN {column} {data_type};"
-            supabase.rpc("execute_sql", {"sql": sql}).execute()
-            clear_model_cache()
-            return {"success": True, "message": f"Added column {column} to {table}.", "data": None, "error": None}
-        elif command.get("type") == "create_table":
-            table = command["table"]
-            columns = command["columns"] # list of dicts: [{"name":..., "type":...}]
-            cols_sql = ", ".join([f'{c["name"]} {c["type"]}' for c in columns])
-            sql = f"CREATE TABLE {table} ({cols_sql});"
-            supabase.rpc("execute_sql", {"sql": sql}).execute()
-            clear_model_cache()
-            return {"success": True, "message": f"Created table {table}.", "data": None, "error": None}
-        else:
-            return {"success": False, "message": "Unknown command type", "data": None, "error": {"code": "unknown_command", "detail": str(command)}}
+        await run_query(lambda db: db.rpc("execute_sql", {"sql": sql}).execute(), retry=False)
+        invalidate_models([table])
+        return {"success": True, "message": message, "data": None, "error": None}
     except Exception as e:
         return {"success": False, "message": "Schema command failed", "data": None, "error": {"code": "schema_error", "detail": str(e)}}
+
+# --- Schema Migration Handler ---
+# Tables must exist before columns can be added to them.
+_COMMAND_ORDER = {"create_table": 0, "add_column": 1}
+
+async def handle_schema_migration(commands: list) -> dict:
+    """
+    Applies a batch of schema commands atomically in a single execute_sql RPC.
+
+    Every command is planned before anything is sent, so a malformed command
+    rejects the whole batch. The statements run inside one function call, which
+    Postgres executes as one transaction: either all of them apply or none do.
+    Only the models of the affected tables are invalidated, once.
+    """
+    if not commands:
+        return {"success": False, "message": "No schema commands given", "data": {"results": []}, "error": {"code": "empty_migration", "detail": None}}
+    results = []
+    planned = []
+    for index, command in enumerate(commands):
+        try:
+            table, sql, message = plan_schema_command(command)
+            planned.append((index, table, sql, message))
+            results.append({"index": index, "success": True, "message": message, "error": None})
+        except UnknownSchemaCommand as e:
+            results.append({"index": index, "success": False, "message": "Unknown command type", "error": {"code": "unknown_command", "detail": str(e)}})
+        except Exception as e:
+            results.append({"index": index, "success": False, "message": "Invalid schema command", "error": {"code": "schema_error", "detail": str(e)}})
+    if len(planned) != len(commands):
+        for result in results:
+            if result["success"]:
+                result.update(success=False, message="Not applied: migration rejected")
+        return {"success": False, "message": "Migration rejected during planning", "data": {"results": results}, "error": {"code": "invalid_migration", "detail": None}}
+
+    planned.sort(key=lambda p: (_COMMAND_ORDER[commands[p[0]]["type"]], p[0]))
+    sql = "\n".join(p[2] for p in planned)
+    try:
+        # Never retried: a migration that timed out may still have committed, and
+        # re-running CREATE TABLE / ADD COLUMN would then fail and report a rollback.
+        await run_query(lambda db: db.rpc("execute_sql", {"sql": sql}).execute(), retry=False)
+    except Exception as e:
+        for result in results:
+            result.update(success=False, message="Not applied: migration rolled back")
+        return {"success": False, "message": "Migration failed and was rolled back", "data": {"results": results}, "error": {"code": "schema_error", "detail": str(e)}}
+    invalidate_models({p[1] for p in planned})
+    return {"success": True, "message": f"Applied {len(planned)} schema commands.", "data": {"results": results}, "error": None}
@@ -1,7 +1,7 @@
 """
 Response models for DatabaseAgent tool outputs.
 """
-from typing import Any, Optional
+from typing import Any, Optional, Union
 from pydantic import BaseModel, ConfigDict
 
 class DatabaseAgentResponse(BaseModel):
@@ -10,5 +10,5 @@ class DatabaseAgentResponse(BaseModel):
     """
     success: bool
     message: str
-    data: Optional[dict] = None # Changed from Any
+    data: Optional[Union[dict, list]] = None # fetch returns a list of rows
     error: Optional[dict] = None # Changed from Any
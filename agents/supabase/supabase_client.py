@@ -1,17 +1,97 @@
 """
-Supabase client singleton initialization.
+Supabase client initialization.
+
+The synchronous singleton is kept for scripts; the agent tools use the async
+client, which shares one pooled HTTP connection set across all queries. Calls
+go through ``run_query`` so concurrency, per-query timeouts and retries on
+transient errors are applied in one place. Retries are opt-in: a timed-out
+request may still have been applied, so only idempotent queries (selects and
+upserts keyed by id) should ask for them.
 """
 import os
-from supabase import create_client, Client
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+from postgrest.exceptions import APIError
+from supabase import create_client, acreate_client, Client, AsyncClient
 
 _supabase_client = None
+_async_supabase_client: Optional[AsyncClient] = None
+_async_client_lock = asyncio.Lock()
+_query_semaphore: Optional[asyncio.Semaphore] = None
+
+SUPABASE_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "10"))
+SUPABASE_QUERY_TIMEOUT = float(os.getenv("SUPABASE_QUERY_TIMEOUT", "10"))
+SUPABASE_QUERY_RETRIES = int(os.getenv("SUPABASE_QUERY_RETRIES", "3"))
+SUPABASE_RETRY_BACKOFF = float(os.getenv("SUPABASE_RETRY_BACKOFF", "0.2"))
+
+
+def _get_credentials() -> tuple[str, str]:
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_ANON_KEY")
+    if not url or not key:
+        raise RuntimeError("Supabase credentials not set in environment.")
+    return url, key
+
 
 def get_supabase_client() -> Client:
     global _supabase_client
     if _supabase_client is None:
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_ANON_KEY")
-        if not url or not key:
-            raise RuntimeError("Supabase credentials not set in environment.")
+        url, key = _get_credentials()
         _supabase_client = create_client(url, key)
     return _supabase_client
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    global _async_supabase_client
+    if _async_supabase_client is None:
+        async with _async_client_lock:
+            if _async_supabase_client is None:
+                url, key = _get_credentials()
+                _async_supabase_client = await acreate_client(url, key)
+    return _async_supabase_client
+
+
+def _get_query_semaphore() -> asyncio.Semaphore:
+    global _query_semaphore
+    if _query_semaphore is None:
+        _query_semaphore = asyncio.Semaphore(SUPABASE_MAX_CONCURRENCY)
+    return _query_semaphore
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, APIError):
+        # PostgREST surfaces gateway/overload failures with 5xx or 429 codes.
+        return str(error.code).startswith("5") or str(error.code) == "429"
+    return False
+
+
+async def run_query(build: Callable[[AsyncClient], Awaitable[Any]], retry: bool = False) -> Any:
+    """
+    Run a single Supabase query with bounded concurrency, a timeout and optional retries.
+
+    Args:
+        build: Callable taking the async client and returning the awaitable to run,
+            e.g. ``lambda db: db.table("categories").select("name").execute()``.
+            It is called again on every retry so each attempt gets a fresh request.
+        retry: Retry transient failures. Only safe for idempotent queries, since
+            a request that timed out may still have been applied.
+
+    Returns:
+        The query response.
+    """
+    client = await get_async_supabase_client()
+    attempt = 0
+    while True:
+        try:
+            async with _get_query_semaphore():
+                return await asyncio.wait_for(build(client), timeout=SUPABASE_QUERY_TIMEOUT)
+        except Exception as e:
+            attempt += 1
+            if not retry or attempt >= SUPABASE_QUERY_RETRIES or not _is_transient(e):
+                raise
+            print(f"Transient Supabase error (attempt {attempt}/{SUPABASE_QUERY_RETRIES}): {e}")
+            await asyncio.sleep(SUPABASE_RETRY_BACKOFF * 2 ** (attempt - 1))
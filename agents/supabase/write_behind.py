@@ -0,0 +1,239 @@
+"""
+Write-behind batching for Supabase upserts.
+
+When SUPABASE_WRITE_BEHIND is enabled, handle_insert acknowledges a row as soon
+as it is appended to a local log and buffered. Buffered rows are upserted per
+table in batches, when a table reaches WRITE_BEHIND_BATCH_SIZE rows or every
+WRITE_BEHIND_FLUSH_INTERVAL seconds. A row only leaves the log once its upsert
+has succeeded: rows whose upsert fails stay buffered and the table is retried
+with exponential backoff. Rows still in the log at startup (e.g. after a crash)
+are replayed, and the server flushes everything on shutdown.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+
+from .supabase_client import run_query
+
+SUPABASE_WRITE_BEHIND = os.getenv("SUPABASE_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+WRITE_BEHIND_LOG = os.getenv("WRITE_BEHIND_LOG", "write_behind.log")
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1.0"))
+WRITE_BEHIND_FSYNC = os.getenv("WRITE_BEHIND_FSYNC", "").lower() in ("1", "true", "yes")
+WRITE_BEHIND_RETRY_BACKOFF = float(os.getenv("WRITE_BEHIND_RETRY_BACKOFF", "1.0"))
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", "60"))
+# How many write ids keep a queryable status once they have left the buffer.
+WRITE_STATUS_HISTORY = 10000
+
+PENDING, FLUSHED = "pending", "flushed"
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        log_path: str = WRITE_BEHIND_LOG,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        retry_backoff: float = WRITE_BEHIND_RETRY_BACKOFF,
+        max_backoff: float = WRITE_BEHIND_MAX_BACKOFF,
+    ):
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self._buffers: dict[str, list[tuple[str, dict]]] = {}
+        self._table_locks: dict[str, asyncio.Lock] = {}
+        # Consecutive failed flushes per table, and when the table may be tried again.
+        self._failures: dict[str, int] = {}
+        self._retry_at: dict[str, float] = {}
+        self._status: OrderedDict[str, dict] = OrderedDict()
+        self._log = None
+        self._ticker: Optional[asyncio.Task] = None
+        self._flushes: set[asyncio.Task] = set()
+
+    # --- Log ---
+    def _append_log(self, record: dict) -> None:
+        self._log.write(json.dumps(record) + "\n")
+        self._log.flush()
+        if WRITE_BEHIND_FSYNC:
+            os.fsync(self._log.fileno())
+
+    def _replay_log(self) -> list[dict]:
+        if not os.path.exists(self.log_path):
+            return []
+        pending: dict[str, dict] = {}
+        with open(self.log_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-append; the write was never acknowledged.
+                    continue
+                if record["op"] == "write":
+                    pending[record["id"]] = record
+                elif record["op"] == "flushed":
+                    for write_id in record["ids"]:
+                        pending.pop(write_id, None)
+        return list(pending.values())
+
+    def _compact_log(self, pending: list[dict]) -> None:
+        tmp_path = f"{self.log_path}.tmp"
+        with open(tmp_path, "w") as f:
+            for record in pending:
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, self.log_path)
+
+    # --- Lifecycle ---
+    async def start(self) -> None:
+        if self._ticker is not None:
+            return
+        pending = self._replay_log()
+        self._compact_log(pending)
+        self._log = open(self.log_path, "a")
+        for record in pending:
+            self._buffer(record["id"], record["table"], record["row"])
+        if pending:
+            print(f"Write-behind: replaying {len(pending)} unflushed writes from {self.log_path}")
+        self._ticker = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        if self._ticker is None:
+            return
+        self._ticker.cancel()
+        try:
+            await self._ticker
+        except asyncio.CancelledError:
+            pass
+        self._ticker = None
+        await asyncio.gather(*self._flushes)
+        # One last attempt regardless of backoff; whatever still fails stays in the log.
+        await self.flush_all(force=True)
+        self._log.close()
+        self._compact_log([
+            {"op": "write", "id": write_id, "table": table, "row": row}
+            for table, rows in self._buffers.items()
+            for write_id, row in rows
+        ])
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_all()
+
+    # --- Writes ---
+    def _set_status(self, write_id: str, table: str, status: str, error: Optional[str] = None) -> None:
+        self._status[write_id] = {"write_id": write_id, "table": table, "status": status, "error": error}
+        self._status.move_to_end(write_id)
+        while len(self._status) > WRITE_STATUS_HISTORY:
+            info = next(iter(self._status.values()))
+            if info["status"] == PENDING:
+                break
+            self._status.popitem(last=False)
+
+    def _buffer(self, write_id: str, table: str, row: dict) -> None:
+        self._buffers.setdefault(table, []).append((write_id, row))
+        self._set_status(write_id, table, PENDING)
+
+    async def enqueue(self, table: str, row: dict) -> str:
+        """Durably buffers a row for upsert and returns its write id."""
+        await self.start()
+        write_id = uuid.uuid4().hex
+        self._append_log({"op": "write", "id": write_id, "table": table, "row": row})
+        self._buffer(write_id, table, row)
+        if len(self._buffers[table]) >= self.batch_size:
+            task = asyncio.create_task(self.flush_table(table))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        return write_id
+
+    async def flush_table(self, table: str, force: bool = False) -> None:
+        lock = self._table_locks.setdefault(table, asyncio.Lock())
+        async with lock:
+            if not force and time.monotonic() < self._retry_at.get(table, 0):
+                return
+            batch = self._buffers.pop(table, [])
+            if not batch:
+                return
+            # Rows sharing an id would make one upsert touch the same row twice, so they
+            # are merged column by column (later writes win), as the separate upserts
+            # would have done, and every write folded into the row settles with it.
+            coalesced: dict = {}
+            for write_id, row in batch:
+                key = row.get("id", write_id)
+                ids, previous = coalesced.get(key, ([], {}))
+                coalesced[key] = (ids + [write_id], {**previous, **row})
+            # PostgREST bulk upserts need every row in a request to have the same columns.
+            groups: dict[tuple, list[tuple[list[str], dict]]] = {}
+            for ids, row in coalesced.values():
+                groups.setdefault(tuple(sorted(row)), []).append((ids, row))
+            failed: set[str] = set()
+            error = None
+            for group in groups.values():
+                rows = [row for _, row in group]
+                ids = [write_id for group_ids, _ in group for write_id in group_ids]
+                try:
+                    await run_query(
+                        lambda db, rows=rows: db.table(table).upsert(rows).execute(),
+                        retry=all("id" in row for row in rows),
+                    )
+                except Exception as e:
+                    error = e
+                    failed.update(ids)
+                    self._append_log({"op": "failed", "ids": ids, "error": str(e)})
+                    for write_id in ids:
+                        self._set_status(write_id, table, PENDING, str(e))
+                    continue
+                self._append_log({"op": "flushed", "ids": ids})
+                for write_id in ids:
+                    self._set_status(write_id, table, FLUSHED)
+            if not failed:
+                self._failures.pop(table, None)
+                self._retry_at.pop(table, None)
+                return
+            # Failed rows go back ahead of anything enqueued meanwhile, keeping write order.
+            self._buffers[table] = [entry for entry in batch if entry[0] in failed] + self._buffers.get(table, [])
+            attempts = self._failures[table] = self._failures.get(table, 0) + 1
+            delay = min(self.retry_backoff * 2 ** (attempts - 1), self.max_backoff)
+            self._retry_at[table] = time.monotonic() + delay
+            print(f"Write-behind flush of {len(failed)} rows to {table} failed (attempt {attempts}), retrying in {delay:.1f}s: {error}")
+
+    async def flush_all(self, force: bool = False) -> None:
+        await asyncio.gather(*(self.flush_table(table, force) for table in list(self._buffers)))
+
+    def status(self, write_id: str) -> Optional[dict]:
+        return self._status.get(write_id)
+
+
+_write_behind_queue: Optional[WriteBehindQueue] = None
+
+
+def get_write_behind_queue() -> WriteBehindQueue:
+    global _write_behind_queue
+    if _write_behind_queue is None:
+        _write_behind_queue = WriteBehindQueue()
+    return _write_behind_queue
+
+
+async def start_write_behind() -> None:
+    if SUPABASE_WRITE_BEHIND:
+        await get_write_behind_queue().start()
+
+
+async def stop_write_behind() -> None:
+    if _write_behind_queue is not None:
+        await _write_behind_queue.stop()
+
+
+def get_write_status(write_id: str) -> Optional[dict]:
+    """Status of an acknowledged write: pending or flushed (None if unknown).
+
+    A pending write whose last flush attempt failed carries that error.
+    """
+    if _write_behind_queue is None:
+        return None
+    return _write_behind_queue.status(write_id)
@@ -1,3 +1,5 @@
+import asyncio
+
 import uvicorn
 
 from a2a.server.apps import A2AStarletteApplication
@@ -32,13 +34,16 @@ class SupabaseServerContextManager:
             version='1.0.0',
             defaultInputModes=['text'],
             defaultOutputModes=['text'],
-            capabilities=AgentCapabilities(streaming=False),
+            capabilities=AgentCapabilities(streaming=True),
             skills=[create_row],
         )
 
+        # Kept on the manager so tooling (e.g. the load tester) can inspect them.
+        self.executor = SupbaseAgentExecutor()
+        self.task_store = InMemoryTaskStore()
         request_handler = DefaultRequestHandler(
-            agent_executor=SupbaseAgentExecutor(),
-            task_store=InMemoryTaskStore(),
+            agent_executor=self.executor,
+            task_store=self.task_store,
         )
 
         server = A2AStarletteApplication(
@@ -50,7 +55,6 @@ class SupabaseServerContextManager:
         self.server_instance = uvicorn.Server(config)
         
         # Start server in background
-        import asyncio
         self.server_task = asyncio.create_task(self.server_instance.serve())
         
         return self
@@ -7,7 +7,6 @@ from a2a.types import (
     InvalidParamsError,
     Part,
     Task,
-    TextPart,
     UnsupportedOperationError,
 )
 from a2a.utils import (
@@ -16,17 +15,28 @@ from a2a.utils import (
 )
 from a2a.utils.errors import ServerError
 
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from pydantic import BaseModel
 from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    FunctionToolCallEvent,
+    FunctionToolResultEvent,
+    PartDeltaEvent,
+    PartStartEvent,
+    TextPart,
+    TextPartDelta,
+)
 
 from .shared import get_model
 from .supabase.database_operations import handle_fetch as _handle_fetch
 from .supabase.database_operations import handle_insert as _handle_insert
 from .supabase.database_operations import \
     handle_schema_command as _handle_schema_command
+from .supabase.database_operations import \
+    handle_schema_migration as _handle_schema_migration
 from .supabase.response_models import DatabaseAgentResponse
+from notes_index import get_notes_index
 
 
 class InsertInput(BaseModel):
@@ -41,6 +51,13 @@ class FetchInput(BaseModel):
 class SchemaCommandInput(BaseModel):
     command: Dict
 
+class SchemaMigrationInput(BaseModel):
+    commands: List[Dict]
+
+class NotesSearchInput(BaseModel):
+    terms: List[str]
+    match_all: bool = True
+
 async def insert(inputs: InsertInput) -> DatabaseAgentResponse:
     """
     Insert or upsert a record in the specified table.
@@ -51,7 +68,7 @@ async def insert(inputs: InsertInput) -> DatabaseAgentResponse:
     Returns:
         DatabaseAgentResponse: The result of the insert operation.
     """
-    result = _handle_insert(inputs.table, inputs.data, inputs.schema_changes)
+    result = await _handle_insert(inputs.table, inputs.data, inputs.schema_changes)
     return DatabaseAgentResponse(**result)
 
 async def fetch(inputs: FetchInput) -> DatabaseAgentResponse:
@@ -64,7 +81,7 @@ async def fetch(inputs: FetchInput) -> DatabaseAgentResponse:
     Returns:
         DatabaseAgentResponse: The result of the fetch operation.
     """
-    result = _handle_fetch(inputs.table, inputs.filters)
+    result = await _handle_fetch(inputs.table, inputs.filters)
     return DatabaseAgentResponse(**result)
 
 async def schema_command(inputs: SchemaCommandInput) -> DatabaseAgentResponse:
@@ -77,18 +94,80 @@ async def schema_command(inputs: SchemaCommandInput) -> DatabaseAgentResponse:
     Returns:
         DatabaseAgentResponse: The result of the schema command operation.
     """
-    result = _handle_schema_command(inputs.command)
+    result = await _handle_schema_command(inputs.command)
     return DatabaseAgentResponse(**result)
 
+async def schema_migration(inputs: SchemaMigrationInput) -> DatabaseAgentResponse:
+    """
+    Apply several schema commands (add column, create table) as one all-or-nothing migration.
+    Prefer this over repeated schema_command calls when setting up tables.
+
+    Args:
+        inputs (SchemaMigrationInput): The list of schema commands.
+
+    Returns:
+        DatabaseAgentResponse: The overall result, with a per-command result list in data.
+    """
+    result = await _handle_schema_migration(inputs.commands)
+    return DatabaseAgentResponse(**result)
+
+async def search_notes(inputs: NotesSearchInput) -> DatabaseAgentResponse:
+    """
+    Look up notes and video transcripts by hashtag or keyword in the notes index.
+
+    Args:
+        inputs (NotesSearchInput): Hashtags (with or without '#') or keywords, and whether
+            documents must match all of them or any.
+
+    Returns:
+        DatabaseAgentResponse: Matching document ids mapped to their matching chunk ids,
+        plus each document's extracted ideas.
+    """
+    index = get_notes_index()
+    matches = index.search(inputs.terms, inputs.match_all)
+    data = {doc_id: {"chunks": chunks, "ideas": index.document_ideas(doc_id)} for doc_id, chunks in matches.items()}
+    return DatabaseAgentResponse(success=True, message=f"Found {len(data)} documents", data=data)
+
 class SupabaseAgent:
     def __init__(self):
         self.agent = Agent(
-            get_model(),
+            get_model(agent_name='supabase'),
            system_prompt="""You are a database specialist. Help users manage their database. You have access to several tools to 
-           complete all of the basic CRUD functions. You can use the insert, fetch, and schema_command tools to perform these actions,
-           which means you can create and edit tables. Always respond with whether or not the action was successful.""",
-           tools=[insert, fetch, schema_command])
-
-    def invoke(self, query: str) -> AgentRunResult[str]:
-        return self.agent.run_sync(query)
-
+           complete all of the basic CRUD functions. You can use the insert, fetch, schema_command and schema_migration tools to perform these actions,
+           which means you can create and edit tables. Use schema_migration when several schema changes are needed.
+           Use search_notes to find notes and transcripts by hashtag or keyword. Always respond with whether or not the action was successful.""",
+           tools=[insert, fetch, schema_command, schema_migration, search_notes])
+
+    async def invoke(self, query: str) -> AgentRunResult[str]:
+        return await self.agent.run(query)
+
+    async def stream(self, query: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Runs the agent node by node, yielding progress events as they happen:
+        ``tool_started``, ``tool_finished`` (with the tool's response), ``text``
+        (partial model output) and finally ``done`` with the full output.
+        """
+        tool_names = {}
+        async with self.agent.iter(query) as run:
+            async for node in run:
+                if Agent.is_model_request_node(node):
+                    async with node.stream(run.ctx) as request_stream:
+                        async for event in request_stream:
+                            if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart):
+                                if event.part.content:
+                                    yield {"type": "text", "text": event.part.content}
+                            elif isinstance(event, PartDeltaEvent) and isinstance(event.delta, TextPartDelta):
+                                yield {"type": "text", "text": event.delta.content_delta}
+                elif Agent.is_call_tools_node(node):
+                    async with node.stream(run.ctx) as handle_stream:
+                        async for event in handle_stream:
+                            if isinstance(event, FunctionToolCallEvent):
+                                tool_names[event.part.tool_call_id] = event.part.tool_name
+                                yield {"type": "tool_started", "tool": event.part.tool_name, "args": event.part.args}
+                            elif isinstance(event, FunctionToolResultEvent):
+                                yield {
+                                    "type": "tool_finished",
+                                    "tool": tool_names.get(event.tool_call_id, event.result.tool_name),
+                                    "result": event.result.content,
+                                }
+        yield {"type": "done", "output": run.result.output}
@@ -1,21 +1,28 @@
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
+from a2a.server.tasks import TaskUpdater
 from a2a.types import (
+    DataPart,
     FilePart,
     FileWithBytes,
     InvalidParamsError,
     Part,
     Task,
+    TaskState,
     TextPart,
     UnsupportedOperationError,
 )
 from a2a.utils import (
-    completed_task,
     new_agent_text_message,
-    new_artifact,
+    new_task,
 )
 from a2a.utils.errors import ServerError
 from .supabase_agent import SupabaseAgent
+from .usage_accounting import budget_limits, usage_ledger
+from .supabase.response_models import DatabaseAgentResponse
+
+# Partial text is buffered up to this many characters per artifact chunk.
+STREAM_CHUNK_CHARS = 200
 
 class SupbaseAgentExecutor(AgentExecutor):
     def __init__(self):
@@ -28,20 +35,80 @@ class SupbaseAgentExecutor(AgentExecutor):
     ) -> None:
 
         query = context.get_user_input()
+        task = context.current_task
+        if task is None:
+            task = new_task(context.message)
+            await event_queue.enqueue_event(task)
+        updater = TaskUpdater(event_queue, task.id, task.contextId)
+        await updater.start_work()
+
+        text_artifact_id = f'{task.id}-response'
+        text_started = False
+        pending_text = ''
+        rows_fetched = 0
+
+        async def flush_text(last_chunk: bool = False) -> None:
+            nonlocal pending_text, text_started
+            # Nothing to add, unless an artifact that was started has to be closed.
+            if not pending_text and not (last_chunk and text_started):
+                return
+            await updater.add_artifact(
+                [Part(root=TextPart(text=pending_text))],
+                artifact_id=text_artifact_id,
+                name='response',
+                append=text_started,
+                last_chunk=last_chunk,
+            )
+            text_started = True
+            pending_text = ''
+
+        # A caller delegating part of its request sends what is left of its budget.
+        metadata = (context.message.metadata if context.message else None) or {}
+        limits = budget_limits(metadata.get('usage_budget'))
+
         try:
-            result = self.agent.invoke(query)
-            print(f'Final Result ===> {result}')
+            with usage_ledger(**limits) as ledger:
+                async for event in self.agent.stream(query):
+                    if event['type'] == 'text':
+                        pending_text += event['text']
+                        if len(pending_text) >= STREAM_CHUNK_CHARS:
+                            await flush_text()
+                    elif event['type'] == 'tool_started':
+                        await updater.update_status(
+                            TaskState.working,
+                            new_agent_text_message(f"Running {event['tool']}...", task.contextId, task.id),
+                        )
+                    elif event['type'] == 'tool_finished':
+                        result = event['result']
+                        if event['tool'] == 'fetch' and isinstance(result, DatabaseAgentResponse) and isinstance(result.data, list):
+                            rows_fetched += len(result.data)
+                            await updater.add_artifact(
+                                [Part(root=DataPart(data={'rows': result.data}))],
+                                name='rows',
+                            )
+                            message = f'{event["tool"]} finished, {rows_fetched} rows fetched so far'
+                        else:
+                            message = f'{event["tool"]} finished'
+                        await updater.update_status(
+                            TaskState.working,
+                            new_agent_text_message(message, task.contextId, task.id),
+                        )
+                    elif event['type'] == 'done':
+                        print(f'Final Result ===> {event["output"]}')
+                        if not text_started and not pending_text:
+                            # No text was streamed, e.g. a non-text output; it still belongs in the artifact.
+                            pending_text = str(event['output'] or '')
+                        await flush_text(last_chunk=True)
+                        # The answer is in the response artifact; the status message only reports completion.
+                        message = new_agent_text_message('Completed', task.contextId, task.id)
+                        # Lets callers fold this run's tokens into their own request budget.
+                        message.metadata = {'usage': ledger.summary()}
+                        await updater.complete(message)
         except Exception as e:
             print('Error invoking agent: %s', e)
-
-        await event_queue.enqueue_event(
-            completed_task(
-                context.task_id,
-                context.context_id,
-                new_agent_text_message(result),
-                [context.message],
-            )
-        )
+            message = new_agent_text_message(f'Error invoking agent: {e}', task.contextId, task.id)
+            message.metadata = {'usage': ledger.summary()}
+            await updater.failed(message)
 
     async def cancel(
         self, request: RequestContext, event_queue: EventQueue
@@ -0,0 +1,195 @@
+"""
+Per-request token usage accounting and budget enforcement.
+
+Every model returned by ``get_model`` is metered: each request's usage is added
+to process-wide per-agent and per-model rollups and to the ledger of the
+request currently being served (held in a context variable, so nested agent
+runs within one request share it). A request whose ledger goes over its token
+or tool-call limit is stopped with ``UsageLimitExceeded``. Work delegated to
+another agent server carries the request's remaining budget along, so the
+remote run is stopped at the same point.
+"""
+import os
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, Optional
+
+from pydantic_ai.exceptions import UsageLimitExceeded
+from pydantic_ai.messages import ModelMessage, ModelResponse, ToolCallPart
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import Usage
+
+# 0 disables a limit.
+REQUEST_TOKEN_LIMIT = int(os.getenv("REQUEST_TOKEN_LIMIT", "200000")) or None
+REQUEST_TOOL_CALL_LIMIT = int(os.getenv("REQUEST_TOOL_CALL_LIMIT", "50")) or None
+
+
+def _usage_dict(usage: Usage) -> dict:
+    return {
+        "requests": usage.requests,
+        "request_tokens": usage.request_tokens or 0,
+        "response_tokens": usage.response_tokens or 0,
+        "total_tokens": usage.total_tokens or 0,
+    }
+
+
+def _usage_from_dict(data: dict) -> Usage:
+    return Usage(
+        requests=data.get("requests", 0),
+        request_tokens=data.get("request_tokens"),
+        response_tokens=data.get("response_tokens"),
+        total_tokens=data.get("total_tokens"),
+    )
+
+
+@dataclass
+class UsageLedger:
+    """Usage of one request across all the agent runs it triggers."""
+    token_limit: Optional[int] = REQUEST_TOKEN_LIMIT
+    tool_call_limit: Optional[int] = REQUEST_TOOL_CALL_LIMIT
+    usage: Usage = field(default_factory=Usage)
+    tool_calls: int = 0
+    by_agent: dict[str, Usage] = field(default_factory=dict)
+    by_model: dict[str, Usage] = field(default_factory=dict)
+
+    def record(self, agent: str, model: str, usage: Usage, tool_calls: int = 0) -> None:
+        self.usage.incr(usage)
+        self.by_agent.setdefault(agent, Usage()).incr(usage)
+        self.by_model.setdefault(model, Usage()).incr(usage)
+        self.tool_calls += tool_calls
+
+    def check(self) -> None:
+        total = self.usage.total_tokens or 0
+        if self.token_limit is not None and total > self.token_limit:
+            raise UsageLimitExceeded(f"Exceeded the request token limit of {self.token_limit} (total_tokens={total})")
+        if self.tool_call_limit is not None and self.tool_calls > self.tool_call_limit:
+            raise UsageLimitExceeded(f"Exceeded the request tool call limit of {self.tool_call_limit} (tool_calls={self.tool_calls})")
+
+    def remaining(self) -> dict:
+        """What is left of the limits, as keyword arguments for ``usage_ledger``."""
+        return {
+            "token_limit": None if self.token_limit is None else max(0, self.token_limit - (self.usage.total_tokens or 0)),
+            "tool_call_limit": None if self.tool_call_limit is None else max(0, self.tool_call_limit - self.tool_calls),
+        }
+
+    def summary(self) -> dict:
+        return {
+            **_usage_dict(self.usage),
+            "tool_calls": self.tool_calls,
+            "by_agent": {name: _usage_dict(u) for name, u in self.by_agent.items()},
+            "by_model": {name: _usage_dict(u) for name, u in self.by_model.items()},
+        }
+
+
+_current_ledger: ContextVar[Optional[UsageLedger]] = ContextVar("usage_ledger", default=None)
+# Process-lifetime rollups, for finding the expensive paths.
+_totals = UsageLedger(token_limit=None, tool_call_limit=None)
+
+
+@contextmanager
+def usage_ledger(**limits) -> Iterator[UsageLedger]:
+    """Collects the usage of everything run inside the block into a new ledger."""
+    ledger = UsageLedger(**limits)
+    token = _current_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current_ledger.reset(token)
+
+
+def current_ledger() -> Optional[UsageLedger]:
+    return _current_ledger.get()
+
+
+def remaining_budget() -> Optional[dict]:
+    """The current request's remaining limits, to send along with delegated work."""
+    ledger = _current_ledger.get()
+    return ledger.remaining() if ledger is not None else None
+
+
+def budget_limits(budget: Optional[dict]) -> dict:
+    """
+    Ledger limits for a run on behalf of a caller that sent its remaining budget.
+    A caller can only tighten this server's own limits, never loosen them.
+    """
+    limits = {"token_limit": REQUEST_TOKEN_LIMIT, "tool_call_limit": REQUEST_TOOL_CALL_LIMIT}
+    for name, local in limits.items():
+        remote = (budget or {}).get(name)
+        if isinstance(remote, int):
+            limits[name] = remote if local is None else min(remote, local)
+    return limits
+
+
+def record_usage(agent: str, model: str, usage: Usage, tool_calls: int = 0) -> None:
+    """Adds usage to the rollups and to the current request's ledger, enforcing its limits."""
+    _totals.record(agent, model, usage, tool_calls)
+    ledger = _current_ledger.get()
+    if ledger is not None:
+        ledger.record(agent, model, usage, tool_calls)
+        ledger.check()
+
+
+def merge_remote_usage(summary: Optional[dict]) -> None:
+    """Folds a ledger summary reported by another agent server into the current ledger."""
+    ledger = _current_ledger.get()
+    if ledger is None or not summary:
+        return
+    for model, data in summary.get("by_model", {}).items():
+        ledger.by_model.setdefault(model, Usage()).incr(_usage_from_dict(data))
+    for agent, data in summary.get("by_agent", {}).items():
+        ledger.by_agent.setdefault(agent, Usage()).incr(_usage_from_dict(data))
+    ledger.usage.incr(_usage_from_dict(summary))
+    ledger.tool_calls += summary.get("tool_calls", 0)
+    ledger.check()
+
+
+def usage_rollups() -> dict:
+    """Process-lifetime usage per agent and per model."""
+    return _totals.summary()
+
+
+class MeteredModel(WrapperModel):
+    """Records the usage and tool calls of every request made by one agent."""
+
+    def __init__(self, wrapped: Model, agent_name: str):
+        super().__init__(wrapped)
+        self.agent_name = agent_name
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> tuple[ModelResponse, Usage]:
+        self._check_budget()
+        response, usage = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        self._record(response, usage, model_request_parameters)
+        return response, usage
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> AsyncIterator[StreamedResponse]:
+        self._check_budget()
+        async with self.wrapped.request_stream(messages, model_settings, model_request_parameters) as stream:
+            yield stream
+        self._record(stream.get(), stream.usage(), model_request_parameters)
+
+    def _check_budget(self) -> None:
+        ledger = _current_ledger.get()
+        if ledger is not None:
+            ledger.check()
+
+    def _record(self, response: ModelResponse, usage: Usage, model_request_parameters: ModelRequestParameters) -> None:
+        # Output tools also arrive as tool calls, but they carry the final answer rather than doing work.
+        function_tools = {tool.name for tool in model_request_parameters.function_tools}
+        tool_calls = sum(isinstance(part, ToolCallPart) and part.tool_name in function_tools for part in response.parts)
+        metered = Usage(requests=1)
+        metered.incr(usage)
+        record_usage(self.agent_name, self.model_name, metered, tool_calls)
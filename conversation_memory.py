@@ -0,0 +1,180 @@
+"""
+Server-side conversation sessions with token-budgeted history.
+
+Histories live in an LRU/TTL-bounded in-memory store, optionally backed by
+SQLite. When a history grows past HISTORY_TOKEN_BUDGET, the oldest turns are
+dropped (or summarized) in one step down to HISTORY_COMPACT_TARGET, so the
+prompt prefix only changes at compaction time and provider prompt caching
+keeps working between compactions.
+"""
+import os
+import time
+import asyncio
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    SystemPromptPart,
+    UserPromptPart,
+)
+
+from agents.shared import get_model
+
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH")  # unset = in-memory only
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+HISTORY_COMPACT_TARGET = int(os.getenv("HISTORY_COMPACT_TARGET", str(HISTORY_TOKEN_BUDGET // 2)))
+HISTORY_COMPACTION = os.getenv("HISTORY_COMPACTION", "truncate")  # truncate | summarize
+
+# Rough heuristic; good enough for budgeting without a tokenizer dependency.
+CHARS_PER_TOKEN = 4
+
+summarizer = Agent(
+    get_model(agent_name='history_summarizer'),
+    system_prompt="""Summarize the earlier part of a conversation between a user and an assistant.
+    Keep facts, decisions, names, ids and URLs that later turns may refer to. Be concise.""",
+)
+
+
+def estimate_tokens(messages: List[ModelMessage]) -> int:
+    return len(ModelMessagesTypeAdapter.dump_json(messages)) // CHARS_PER_TOKEN
+
+
+def _turn_starts(messages: List[ModelMessage]) -> List[int]:
+    """Indices of requests that begin a user turn; only these are safe cut points."""
+    return [
+        i for i, m in enumerate(messages)
+        if isinstance(m, ModelRequest) and any(isinstance(p, UserPromptPart) for p in m.parts)
+    ]
+
+
+def _system_parts(messages: List[ModelMessage]) -> List[SystemPromptPart]:
+    if not messages or not isinstance(messages[0], ModelRequest):
+        return []
+    return [p for p in messages[0].parts if isinstance(p, SystemPromptPart)]
+
+
+@dataclass
+class Session:
+    session_id: str
+    messages: List[ModelMessage] = field(default_factory=list)
+    summary: Optional[str] = None
+    updated_at: float = field(default_factory=time.time)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ConversationStore:
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_COUNT,
+        ttl: float = SESSION_TTL,
+        db_path: Optional[str] = SESSION_DB_PATH,
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    messages BLOB NOT NULL,
+                    summary TEXT,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._db.commit()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl
+        for session_id, session in list(self._sessions.items()):
+            if session.updated_at >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            # A session with a turn in flight must stay, or the next request for its id
+            # would get a fresh Session (and lock) and run concurrently on stale history.
+            if session.lock.locked():
+                continue
+            del self._sessions[session_id]
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+            self._db.commit()
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT messages, summary, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or row[2] < time.time() - self.ttl:
+            return None
+        return Session(session_id, ModelMessagesTypeAdapter.validate_json(row[0]), row[1], row[2])
+
+    def get(self, session_id: str) -> Session:
+        """Returns the session, creating it if it is unknown or has expired."""
+        session = self._sessions.get(session_id) or self._load(session_id) or Session(session_id)
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        self._expire()
+        return session
+
+    def save(self, session: Session, messages: List[ModelMessage]) -> None:
+        session.messages = messages
+        session.updated_at = time.time()
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                (session.session_id, ModelMessagesTypeAdapter.dump_json(messages), session.summary, session.updated_at),
+            )
+            self._db.commit()
+
+    async def compact(self, session: Session, messages: List[ModelMessage]) -> List[ModelMessage]:
+        """
+        Drops the oldest whole turns once the history exceeds the token budget,
+        keeping the system prompt (plus a summary of dropped turns when
+        summarizing) as a stable first message.
+        """
+        if estimate_tokens(messages) <= HISTORY_TOKEN_BUDGET:
+            return messages
+        starts = _turn_starts(messages)
+        cut = None
+        for start in starts[1:]:
+            if estimate_tokens(messages[start:]) <= HISTORY_COMPACT_TARGET:
+                cut = start
+                break
+        if cut is None:
+            # Even the latest turn alone is over target; keep just that turn.
+            cut = starts[-1] if starts else 0
+        if cut == 0:
+            return messages
+        dropped, kept = messages[:cut], messages[cut:]
+        if HISTORY_COMPACTION == "summarize":
+            try:
+                previous = f"Earlier summary:\n{session.summary}\n\n" if session.summary else ""
+                transcript = ModelMessagesTypeAdapter.dump_json(dropped).decode()
+                session.summary = (await summarizer.run(f"{previous}Conversation:\n{transcript}")).output
+            except Exception as e:
+                print(f"History summarization failed, truncating instead: {e}")
+        head_parts = list(_system_parts(messages))
+        if HISTORY_COMPACTION == "summarize" and session.summary:
+            head_parts = [p for p in head_parts if not p.content.startswith("Summary of earlier conversation:")]
+            head_parts.append(SystemPromptPart(content=f"Summary of earlier conversation:\n{session.summary}"))
+        print(f"Compacted session {session.session_id}: dropped {len(dropped)} messages")
+        return ([ModelRequest(parts=head_parts)] if head_parts else []) + kept
+
+
+_conversation_store: Optional[ConversationStore] = None
+
+
+def get_conversation_store() -> ConversationStore:
+    global _conversation_store
+    if _conversation_store is None:
+        _conversation_store = ConversationStore()
+    return _conversation_store
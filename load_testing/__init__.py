@@ -0,0 +1,3 @@
+"""
+Load and soak testing tools for the A2A agent servers.
+"""
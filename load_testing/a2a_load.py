@@ -0,0 +1,286 @@
+"""
+Load generator and soak tester for the A2A agent servers in agent_registry.
+
+Sends A2A ``message/send`` requests from concurrent workers for a fixed
+duration and reports latency histograms, error rates and, over time, the
+server's RSS, the size of its task store and event-loop stalls. Memory that
+keeps growing and stalls above the threshold are flagged in the report. Growth
+is fitted only after the first ``--warmup-seconds`` of load, so caches and
+connection pools filling up at the start are not mistaken for a leak.
+
+With ``--in-process`` the Supabase agent server is started inside this process
+against a fake Supabase backend (and, with ``--fake-llm``, test models for every
+agent it runs), so its task store and event loop can be observed directly.
+
+Usage:
+    python -m load_testing.a2a_load --in-process --fake-llm --concurrency 20 --duration 60
+    python -m load_testing.a2a_load --agent "Supabase Agent" --pid 12345 --duration 600
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from contextlib import ExitStack
+from typing import Dict, List, Optional
+
+import httpx
+
+from agent_registry import registry
+from agents.a2a_client import agent_url, send_message
+
+DEFAULT_MIX = {
+    "Fetch all rows from the notes table.": 3,
+    "Insert a row into the notes table with data {'text': 'load test'}.": 1,
+    "Find notes tagged #ideas.": 1,
+}
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf")]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def slope_per_minute(samples: List[tuple]) -> float:
+    """Least-squares slope of (seconds, value) samples, per minute."""
+    if len(samples) < 2:
+        return 0.0
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_v = sum(v for _, v in samples) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in samples)
+    if var_t == 0:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / var_t * 60
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class LoadStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        # Seconds after `started` at which the workers began sending requests.
+        self.load_started = 0.0
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Counter = Counter()
+        self.requests = 0
+        self.rss: List[tuple] = []
+        self.task_store: List[tuple] = []
+        self.loop_lags: List[float] = []
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def record(self, kind: str, seconds: float, error: Optional[str]) -> None:
+        self.requests += 1
+        self.latencies.setdefault(kind, []).append(seconds)
+        if error:
+            self.errors[error] += 1
+
+    def report(self, stall_threshold: float, rss_growth_threshold: float, warmup_seconds: float = 0.0) -> dict:
+        all_latencies = [s for values in self.latencies.values() for s in values]
+        duration = self.elapsed()
+        histogram = Counter()
+        for s in all_latencies:
+            histogram[next(b for b in LATENCY_BUCKETS if s <= b)] += 1
+
+        def summary(values: List[float]) -> dict:
+            return {
+                "count": len(values),
+                "p50": percentile(values, 0.5),
+                "p90": percentile(values, 0.9),
+                "p99": percentile(values, 0.99),
+                "max": max(values) if values else None,
+            }
+
+        steady_from = self.load_started + warmup_seconds
+        rss = [(t, v) for t, v in self.rss if t >= steady_from]
+        task_store = [(t, v) for t, v in self.task_store if t >= steady_from]
+        flags = []
+        rss_slope = slope_per_minute(rss)
+        if rss_slope > rss_growth_threshold:
+            flags.append(f"RSS growing at {rss_slope:.1f} MB/min after warm-up (threshold {rss_growth_threshold} MB/min)")
+        task_slope = slope_per_minute(task_store)
+        if task_store and task_slope > 0 and task_store[-1][1] > task_store[0][1]:
+            grown = task_store[-1][1] - task_store[0][1]
+            flags.append(f"Task store grew by {grown} entries after warm-up ({task_slope:.0f}/min) and is never evicted")
+        stalls = [lag for lag in self.loop_lags if lag > stall_threshold]
+        if stalls:
+            flags.append(f"{len(stalls)} event-loop stalls over {stall_threshold * 1000:.0f}ms (max {max(stalls) * 1000:.0f}ms)")
+
+        return {
+            "duration_s": round(duration, 1),
+            "warmup_s": warmup_seconds,
+            "requests": self.requests,
+            "throughput_rps": round(self.requests / duration, 2) if duration else 0,
+            "error_rate": sum(self.errors.values()) / self.requests if self.requests else 0,
+            "errors": dict(self.errors),
+            "latency_s": summary(all_latencies),
+            "latency_by_request": {kind: summary(values) for kind, values in self.latencies.items()},
+            "latency_histogram": {("inf" if b == float("inf") else f"<={b}s"): histogram[b] for b in LATENCY_BUCKETS},
+            "rss_mb": {
+                "start": self.rss[0][1] if self.rss else None,
+                "end": self.rss[-1][1] if self.rss else None,
+                "peak": max(v for _, v in self.rss) if self.rss else None,
+                "slope_mb_per_min": round(rss_slope, 2),
+                "samples": [(round(t, 1), round(v, 1)) for t, v in self.rss],
+            },
+            "task_store_size": [(round(t, 1), v) for t, v in self.task_store],
+            "event_loop": {
+                "max_lag_ms": round(max(self.loop_lags) * 1000, 1) if self.loop_lags else None,
+                "stalls": len(stalls),
+            },
+            "flags": flags,
+        }
+
+
+async def _worker(url: str, mix: Dict[str, int], stop_at: float, client: httpx.AsyncClient, stats: LoadStats) -> None:
+    prompts, weights = list(mix), list(mix.values())
+    while time.monotonic() < stop_at:
+        prompt = random.choices(prompts, weights)[0]
+        started = time.monotonic()
+        error = None
+        try:
+            result = await send_message(url, prompt, client)
+            state = (result.get("status") or {}).get("state")
+            if result.get("kind") == "task" and state != "completed":
+                error = f"task_{state}"
+        except httpx.HTTPStatusError as e:
+            error = f"http_{e.response.status_code}"
+        except Exception as e:
+            error = type(e).__name__
+        stats.record(prompt, time.monotonic() - started, error)
+
+
+async def _monitor_loop(interval: float, stats: LoadStats) -> None:
+    """Measures how late the event loop wakes up; lateness means something blocked it."""
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        stats.loop_lags.append(max(0.0, time.monotonic() - started - interval))
+
+
+async def _sample(pid: Optional[int], task_store, interval: float, stats: LoadStats) -> None:
+    while True:
+        if pid is not None:
+            rss = read_rss_mb(pid)
+            if rss is not None:
+                stats.rss.append((stats.elapsed(), rss))
+        if task_store is not None:
+            stats.task_store.append((stats.elapsed(), len(task_store.tasks)))
+        await asyncio.sleep(interval)
+
+
+async def _wait_for_card(url: str, timeout: float = 15) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(f"{url}.well-known/agent.json")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"A2A server at {url} did not come up within {timeout}s")
+            await asyncio.sleep(0.2)
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    url = args.url or agent_url(args.agent)
+    mix = json.loads(args.mix) if args.mix else DEFAULT_MIX
+    stats = LoadStats()
+    pid = args.pid
+    task_store = None
+    background = []
+    manager = None
+    overrides = ExitStack()
+
+    if args.in_process:
+        from agents.supabase_a2a_server import supabase_a2a_main
+        from .fake_supabase import install_fake_supabase
+        install_fake_supabase(args.fake_db_latency)
+        manager = await supabase_a2a_main().__aenter__()
+        if args.fake_llm:
+            from pydantic_ai.models.test import TestModel
+            from agents.supabase.category_classifier import agent as category_agent
+            # Every agent the server runs, so the test never reaches a real model endpoint.
+            for agent in (manager.executor.agent.agent, category_agent):
+                overrides.enter_context(agent.override(model=TestModel()))
+        task_store = manager.task_store
+        pid = os.getpid()
+        # Same loop as the server, so lag here is lag the server sees.
+        background.append(asyncio.create_task(_monitor_loop(args.loop_interval, stats)))
+    await _wait_for_card(url)
+    background.append(asyncio.create_task(_sample(pid, task_store, args.sample_interval, stats)))
+
+    print(f"Load test: {args.concurrency} workers against {url} for {args.duration}s")
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            stats.load_started = stats.elapsed()
+            stop_at = time.monotonic() + args.duration
+            await asyncio.gather(*(_worker(url, mix, stop_at, client, stats) for _ in range(args.concurrency)))
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        overrides.close()
+        if manager is not None:
+            await manager.__aexit__(None, None, None)
+    return stats.report(args.stall_threshold, args.rss_growth_threshold, args.warmup_seconds)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agent", default="Supabase Agent", choices=list(registry), help="Registered agent to target.")
+    parser.add_argument("--url", help="A2A server URL; overrides --agent.")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to generate load for.")
+    parser.add_argument("--warmup-seconds", type=float, default=10, help="Initial seconds of load left out of the growth fits.")
+    parser.add_argument("--mix", help='JSON object of prompt -> weight, e.g. \'{"Fetch all rows from notes.": 3}\'.')
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds.")
+    parser.add_argument("--pid", type=int, help="PID of an external server whose RSS to sample.")
+    parser.add_argument("--in-process", action="store_true", help="Start the Supabase agent server here on a fake Supabase backend.")
+    parser.add_argument("--fake-llm", action="store_true", help="With --in-process, replace every agent's LLM with a test model.")
+    parser.add_argument("--fake-db-latency", type=float, default=0.005, help="Seconds added to every fake Supabase query.")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between RSS/task store samples.")
+    parser.add_argument("--loop-interval", type=float, default=0.05, help="Seconds between event-loop lag probes.")
+    parser.add_argument("--stall-threshold", type=float, default=0.1, help="Loop lag in seconds that counts as a stall.")
+    parser.add_argument("--rss-growth-threshold", type=float, default=5.0, help="RSS growth in MB/min that gets flagged.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run_load(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    for flag in report["flags"]:
+        print(f"FLAG: {flag}")
+
+
+if __name__ == "__main__":
+    main()
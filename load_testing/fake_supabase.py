@@ -0,0 +1,86 @@
+"""
+In-memory stand-in for the async Supabase client, for load tests.
+
+Supports the subset of the query builder used by the database tools
+(table/select/eq/limit/insert/upsert/rpc + execute) with a configurable
+latency. Tables keep only their most recent rows, so the fake backend's own
+storage does not show up as memory growth in the server under test.
+"""
+import asyncio
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+class FakeResponse:
+    def __init__(self, data: Any):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, backend: "FakeSupabase", table: Optional[str]):
+        self.backend = backend
+        self.table = table
+        self.op = "select"
+        self.rows: List[dict] = []
+        self.filters: List[tuple] = []
+        self.max_rows: Optional[int] = None
+
+    def select(self, *columns: str) -> "FakeQuery":
+        self.op = "select"
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append((column, value))
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        self.max_rows = count
+        return self
+
+    def insert(self, rows: dict | list) -> "FakeQuery":
+        self.op = "insert"
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows: dict | list) -> "FakeQuery":
+        self.op = "upsert"
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    async def execute(self) -> FakeResponse:
+        await asyncio.sleep(self.backend.latency)
+        self.backend.queries += 1
+        if self.table is None:
+            return FakeResponse([])
+        table = self.backend.tables.setdefault(self.table, deque(maxlen=self.backend.max_rows_per_table))
+        if self.op == "select":
+            rows = [r for r in table if all(r.get(c) == v for c, v in self.filters)]
+            return FakeResponse(rows[:self.max_rows] if self.max_rows is not None else rows)
+        if self.op == "upsert":
+            ids = {r["id"] for r in self.rows if "id" in r}
+            for existing in [r for r in table if r.get("id") in ids]:
+                table.remove(existing)
+        table.extend(dict(r) for r in self.rows)
+        return FakeResponse(self.rows)
+
+
+class FakeSupabase:
+    def __init__(self, latency: float = 0.005, max_rows_per_table: int = 1000):
+        self.latency = latency
+        self.max_rows_per_table = max_rows_per_table
+        self.tables: Dict[str, deque] = {}
+        self.queries = 0
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[dict] = None) -> FakeQuery:
+        return FakeQuery(self, None)
+
+
+def install_fake_supabase(latency: float = 0.005) -> FakeSupabase:
+    """Makes every Supabase query in this process go to a fresh fake backend."""
+    from agents.supabase import supabase_client
+    fake = FakeSupabase(latency)
+    supabase_client._async_supabase_client = fake
+    return fake
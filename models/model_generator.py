@@ -1,7 +1,7 @@
 """
 Dynamic Pydantic model generation and caching.
 """
-from typing import Dict, Any, Type
+from typing import Dict, Any, Iterable, Type
 from pydantic import BaseModel, create_model
 
 _model_cache = {}
@@ -20,3 +20,7 @@ def get_or_create_model(table: str, columns: Dict[str, str]) -> Type[BaseModel]:
 
 def clear_model_cache():
     _model_cache.clear()
+
+def invalidate_models(tables: Iterable[str]):
+    for table in tables:
+        _model_cache.pop(table, None)
@@ -0,0 +1,5 @@
+"""
+Incremental hashtag and keyword index over notes and video transcripts.
+"""
+from .inverted_index import NotesIndex, get_notes_index
+from .ingest import index_notes_directory, index_transcript
@@ -0,0 +1,73 @@
+"""
+LLM-free extraction of chunks, hashtags and keywords from a document.
+
+Every non-stopword word of a chunk is kept as a keyword so that any of them can
+be looked up; only the document-level ideas are cut down to the most frequent.
+"""
+import re
+from collections import Counter
+from typing import Iterator, List, NamedTuple
+
+from config import Config
+
+# Words stand in for tokens when chunking; close enough for English prose.
+CHUNK_SIZE_WORDS = Config.TRANSCRIPT_CHUNK_SIZE_TOKENS
+CHUNK_OVERLAP_WORDS = Config.TRANSCRIPT_CHUNK_OVERLAP_TOKENS
+
+HASHTAG_RE = re.compile(r"(?<![\w#])#([A-Za-z][\w-]*)")
+WORD_RE = re.compile(r"[a-z][a-z'-]{2,}")
+STOPWORDS = frozenset("""
+    a about above after again against all also am an and any are as at be because been before being below
+    between both but by can could did do does doing down during each even few for from further get got had
+    has have having he her here hers him his how i if in into is it its itself just like make maybe me might
+    more most much must my no nor not now of off on once only or other our ours out over own really same
+    she should so some such than that the their theirs them then there these they thing things this those
+    through to too under until up very want was way we well were what when where which while who whom why
+    will with would yeah you your yours
+""".split())
+
+
+class Chunk(NamedTuple):
+    index: int
+    text: str
+    hashtags: List[str]
+    keywords: List[str]
+
+
+def extract_hashtags(text: str) -> List[str]:
+    return sorted({tag.lower() for tag in HASHTAG_RE.findall(text)})
+
+
+def _words(text: str) -> Iterator[str]:
+    words = (w.strip("'-") for w in WORD_RE.findall(HASHTAG_RE.sub(" ", text.lower())))
+    return (w for w in words if len(w) > 2 and w not in STOPWORDS)
+
+
+def extract_terms(text: str) -> List[str]:
+    """Every distinct non-stopword word of the text."""
+    return sorted(set(_words(text)))
+
+
+def extract_keywords(text: str, limit: int) -> List[str]:
+    """The ``limit`` most frequent non-stopword words of the text."""
+    return [word for word, _ in Counter(_words(text)).most_common(limit)]
+
+
+def split_chunks(text: str, size: int = CHUNK_SIZE_WORDS, overlap: int = CHUNK_OVERLAP_WORDS) -> List[str]:
+    words = text.split()
+    if len(words) <= size:
+        return [text] if words else []
+    step = max(1, size - overlap)
+    return [" ".join(words[start:start + size]) for start in range(0, len(words) - overlap, step)]
+
+
+def extract_chunks(text: str) -> List[Chunk]:
+    return [
+        Chunk(i, chunk, extract_hashtags(chunk), extract_terms(chunk))
+        for i, chunk in enumerate(split_chunks(text))
+    ]
+
+
+def extract_ideas(text: str, limit: int = Config.NUM_IDEAS_TO_EXTRACT_PER_VIDEO) -> List[str]:
+    """The document's dominant keywords, used as a cheap summary of its ideas."""
+    return extract_keywords(text, limit)
@@ -0,0 +1,48 @@
+"""
+Feeding notes and transcripts into the notes index.
+"""
+import os
+from typing import List, Optional
+
+from .inverted_index import NotesIndex, get_notes_index
+
+NOTE_EXTENSIONS = (".md", ".txt")
+
+
+def index_notes_directory(path: str, index: Optional[NotesIndex] = None) -> List[str]:
+    """
+    Indexes every note under ``path``. Unchanged notes are skipped and notes
+    that disappeared since the last run are dropped from the index.
+
+    Returns:
+        The ids of the notes that were (re)indexed.
+    """
+    index = index or get_notes_index()
+    updated = []
+    seen = set()
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if not name.endswith(NOTE_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, name)
+            doc_id = f"note:{os.path.relpath(file_path, path)}"
+            seen.add(doc_id)
+            with open(file_path, encoding="utf-8") as f:
+                if index.upsert_document(doc_id, f.read(), source="note"):
+                    updated.append(doc_id)
+    for doc_id in index.document_ids(source="note"):
+        if doc_id not in seen:
+            index.remove_document(doc_id)
+    print(f"Indexed {len(updated)} changed notes under {path}")
+    return updated
+
+
+def index_transcript(video_id: str, transcript: dict, index: Optional[NotesIndex] = None) -> bool:
+    """
+    Indexes a transcript as returned by ``YouTubeFetcher.fetch_transcript``.
+    Transcripts that are unavailable or unchanged are skipped.
+    """
+    if transcript.get("status") != "available" or not transcript.get("text"):
+        return False
+    index = index or get_notes_index()
+    return index.upsert_document(f"video:{video_id}", transcript["text"], source="transcript")
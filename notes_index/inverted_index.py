@@ -0,0 +1,169 @@
+"""
+Inverted index from hashtags and keywords to document chunks.
+
+Postings are held in memory for lookups and mirrored to SQLite, one row per
+(term, document) with the chunk numbers packed into a string. Documents are
+fingerprinted, so re-indexing only touches new or changed documents. Writes
+may come from a worker thread (the warm-up indexes notes via ``to_thread``), so
+reads take the same lock.
+"""
+import os
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from .extraction import extract_chunks, extract_ideas
+
+NOTES_INDEX_PATH = os.getenv("NOTES_INDEX_PATH", "notes_index.sqlite")
+
+HASHTAG, KEYWORD = "hashtag", "keyword"
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _normalize(term: str) -> str:
+    return term.strip().lstrip("#").lower()
+
+
+class NotesIndex:
+    def __init__(self, path: str = NOTES_INDEX_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS documents (
+                doc_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                ideas TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                kind TEXT NOT NULL,
+                term TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                chunks TEXT NOT NULL,
+                PRIMARY KEY (kind, term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);"""
+        )
+        # kind -> term -> doc_id -> chunk numbers
+        self._postings: Dict[str, Dict[str, Dict[str, List[int]]]] = {HASHTAG: {}, KEYWORD: {}}
+        # doc_id -> (kind, term) pairs it has postings for, so removal doesn't scan every term.
+        self._doc_terms: Dict[str, Set[Tuple[str, str]]] = {}
+        self._documents: Dict[str, dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        for doc_id, source, fingerprint, ideas in self._conn.execute("SELECT * FROM documents"):
+            self._documents[doc_id] = {"source": source, "fingerprint": fingerprint, "ideas": ideas.split(",") if ideas else []}
+        for kind, term, doc_id, chunks in self._conn.execute("SELECT * FROM postings"):
+            self._postings[kind].setdefault(term, {})[doc_id] = [int(c) for c in chunks.split(",")]
+            self._doc_terms.setdefault(doc_id, set()).add((kind, term))
+
+    def _remove_postings(self, doc_id: str) -> None:
+        for kind, term in self._doc_terms.pop(doc_id, ()):
+            docs = self._postings[kind][term]
+            del docs[doc_id]
+            if not docs:
+                del self._postings[kind][term]
+
+    def upsert_document(self, doc_id: str, text: str, source: str = "note") -> bool:
+        """
+        Indexes a document unless it is unchanged since it was last indexed.
+
+        Returns:
+            True if the document was (re)indexed, False if it was skipped.
+        """
+        fingerprint = _fingerprint(text)
+        known = self._documents.get(doc_id)
+        if known and known["fingerprint"] == fingerprint:
+            return False
+        postings: Dict[tuple, List[int]] = {}
+        for chunk in extract_chunks(text):
+            for tag in chunk.hashtags:
+                postings.setdefault((HASHTAG, tag), []).append(chunk.index)
+            for word in chunk.keywords:
+                postings.setdefault((KEYWORD, word), []).append(chunk.index)
+        ideas = extract_ideas(text)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                    (doc_id, source, fingerprint, ",".join(ideas)),
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?, ?)",
+                    [(kind, term, doc_id, ",".join(map(str, chunks))) for (kind, term), chunks in postings.items()],
+                )
+            self._remove_postings(doc_id)
+            for (kind, term), chunks in postings.items():
+                self._postings[kind].setdefault(term, {})[doc_id] = chunks
+            self._doc_terms[doc_id] = set(postings)
+            self._documents[doc_id] = {"source": source, "fingerprint": fingerprint, "ideas": ideas}
+        return True
+
+    def remove_document(self, doc_id: str) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            self._remove_postings(doc_id)
+            self._documents.pop(doc_id, None)
+
+    def lookup(self, term: str, kind: Optional[str] = None) -> Dict[str, List[str]]:
+        """Maps each document containing the term to its matching chunk ids."""
+        with self._lock:
+            return self._lookup(term, kind)
+
+    def _lookup(self, term: str, kind: Optional[str] = None) -> Dict[str, List[str]]:
+        term = _normalize(term)
+        kinds = [kind] if kind else [HASHTAG, KEYWORD]
+        result: Dict[str, Set[int]] = {}
+        for k in kinds:
+            for doc_id, chunks in self._postings[k].get(term, {}).items():
+                result.setdefault(doc_id, set()).update(chunks)
+        return {doc_id: [f"{doc_id}#{c}" for c in sorted(chunks)] for doc_id, chunks in result.items()}
+
+    def search(self, terms: List[str], match_all: bool = True) -> Dict[str, List[str]]:
+        """Documents matching all (or any) of the terms, with the chunks matching any of them."""
+        with self._lock:
+            hits = [self._lookup(term) for term in terms]
+        if not hits:
+            return {}
+        doc_ids = set(hits[0])
+        for hit in hits[1:]:
+            doc_ids = doc_ids & set(hit) if match_all else doc_ids | set(hit)
+        return {
+            doc_id: sorted(
+                {chunk for hit in hits for chunk in hit.get(doc_id, [])},
+                key=lambda chunk: int(chunk.rsplit("#", 1)[1]),
+            )
+            for doc_id in doc_ids
+        }
+
+    def hashtags(self) -> Dict[str, int]:
+        """Every known hashtag with the number of documents using it."""
+        with self._lock:
+            return {tag: len(docs) for tag, docs in self._postings[HASHTAG].items()}
+
+    def document_ids(self, source: Optional[str] = None) -> List[str]:
+        with self._lock:
+            return [d for d, doc in self._documents.items() if source is None or doc["source"] == source]
+
+    def document_ideas(self, doc_id: str) -> List[str]:
+        with self._lock:
+            document = self._documents.get(doc_id)
+            return list(document["ideas"]) if document else []
+
+
+_notes_index: Optional[NotesIndex] = None
+
+
+def get_notes_index() -> NotesIndex:
+    global _notes_index
+    if _notes_index is None:
+        _notes_index = NotesIndex()
+    return _notes_index
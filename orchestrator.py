@@ -7,6 +7,7 @@ from pydantic_ai import Agent, RunContext
 
 import agent_registry
 from agent_searcher import agent_searcher
+from agents.fan_out import SubTaskResult, plan_and_execute
 from agents.shared import get_model
 
 # from agent_runner import agent_runner
@@ -21,10 +22,13 @@ load_dotenv()
 
 system_prompt = """
     Find the correct sub agent to use and return its URL.
+    If the request needs several agents (e.g. search the web and store the results,
+    or check GitHub and the filesystem), use run_subtasks_concurrently instead and
+    summarize the merged results.
     """
 
 orchestrator = Agent(
-    get_model(),
+    get_model(agent_name='orchestrator'),
     system_prompt=system_prompt,
     deps_type=str
 )
@@ -39,6 +43,15 @@ async def search_through_agents(ctx: RunContext[str]) -> Any:
     result = await agent_searcher.run(ctx.deps)
     # result.all_messages()
     return result
+
+@orchestrator.tool
+async def run_subtasks_concurrently(ctx: RunContext[str]) -> list[SubTaskResult]:
+    """
+    Splits a composite request into sub-tasks for several agents and runs the
+    independent ones concurrently. Returns one result per sub-task.
+    """
+    print(f"Fanning out: {ctx.deps}")
+    return await plan_and_execute(ctx.deps)
 #
 # @orchestrator.tool
 # async def run_agent_runner(ctx: RunContext[Deps]) -> SubAgentResponse:
@@ -0,0 +1,96 @@
+"""
+Compact routing context compiled from the agent registry.
+
+The agent cards only change when the registry does, so they are fetched once,
+reduced to name, short description, skill ids and URL, and cached. The agent
+searcher injects the result into its system prompt instead of spending a model
+turn on a tool call to discover the same list on every route.
+"""
+import hashlib
+import json
+import time
+from typing import Any, List, Optional
+
+import httpx
+
+from agent_registry import registry
+
+# Card descriptions are trimmed to keep the routing prompt short.
+MAX_DESCRIPTION_CHARS = 200
+# A context built while some agents were unreachable is rebuilt after this many seconds.
+INCOMPLETE_RETRY_SECONDS = 30
+
+_routing_context: Optional[str] = None
+_registry_fingerprint: Optional[str] = None
+_incomplete_since: Optional[float] = None
+
+
+def _fingerprint() -> str:
+    return hashlib.sha256(json.dumps(registry, sort_keys=True).encode()).hexdigest()
+
+
+def _card_url(entry: dict) -> str:
+    return f'http://localhost:{entry["PORT"]}/.well-known/agent.json'
+
+
+async def fetch_agent_cards() -> List[Any]:
+    """
+    Fetches the agent card of every registered agent that is reachable.
+    """
+    agent_cards = []
+    async with httpx.AsyncClient() as client:
+        for name, entry in registry.items():
+            url = _card_url(entry)
+            try:
+                res = await client.get(url)
+            except httpx.HTTPError as e:
+                print(f"Failed to fetch agent card from {url}: {e}")
+                continue
+            if res.status_code == 200:
+                agent_cards.append(res.json())
+            else:
+                print(f"Failed to fetch agent card from {url}")
+    return agent_cards
+
+
+def _shorten(text: str) -> str:
+    text = " ".join(text.split())
+    if len(text) <= MAX_DESCRIPTION_CHARS:
+        return text
+    return text[:MAX_DESCRIPTION_CHARS - 3].rstrip() + "..."
+
+
+def compile_routing_context(agent_cards: List[dict]) -> str:
+    """
+    Reduces agent cards to one line per agent. Registered agents whose card
+    could not be fetched are listed from their registry entry.
+    """
+    lines = []
+    seen = set()
+    for card in agent_cards:
+        seen.add(card.get("name"))
+        skills = ",".join(skill["id"] for skill in card.get("skills", []))
+        lines.append(f'- {card["name"]} | {_shorten(card.get("description", ""))} | skills: {skills or "-"} | url: {card["url"]}')
+    for name, entry in registry.items():
+        if name not in seen:
+            lines.append(f'- {name} | {_shorten(entry["description"])} | skills: - | url: http://localhost:{entry["PORT"]}/')
+    return "\n".join(sorted(lines))
+
+
+async def refresh_routing_context() -> str:
+    """Re-fetches the agent cards and rebuilds the cached routing context."""
+    global _routing_context, _registry_fingerprint, _incomplete_since
+    _registry_fingerprint = _fingerprint()
+    agent_cards = await fetch_agent_cards()
+    _incomplete_since = time.monotonic() if len(agent_cards) < len(registry) else None
+    _routing_context = compile_routing_context(agent_cards)
+    print(f"Compiled routing context:\n{_routing_context}")
+    return _routing_context
+
+
+async def get_routing_context() -> str:
+    """Returns the cached routing context, rebuilding it if the registry has changed."""
+    stale = _incomplete_since is not None and time.monotonic() - _incomplete_since > INCOMPLETE_RETRY_SECONDS
+    if _routing_context is None or stale or _registry_fingerprint != _fingerprint():
+        return await refresh_routing_context()
+    return _routing_context
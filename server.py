@@ -1,13 +1,30 @@
+import os
 from pydantic import BaseModel, ConfigDict
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import uvicorn
+import asyncio
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 from orchestrator import orchestrator
 from agents.mcp_manager import start_mcp_servers, stop_mcp_servers
 from agents._a2a_server_manager import start_all_a2a_servers, stop_all_a2a_servers
+from agents.llm_cache import get_cache_stats
+from agents.resilient_model import latency_stats
+from agents.supabase.write_behind import start_write_behind, stop_write_behind, get_write_status
+from warmup import warm_up, is_ready, warmup_status
+from conversation_memory import get_conversation_store
+from agents.usage_accounting import usage_ledger, usage_rollups
+from pydantic_ai.exceptions import UsageLimitExceeded
+from utils.responses import FastORJSONResponse, build_response
+
+try:
+    # Optional: negotiates br and falls back to gzip for clients without it.
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 load_dotenv()
 
@@ -15,13 +32,22 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     print("Application startup: Initializing MCP servers...")
     await start_mcp_servers()
+    await start_write_behind()
     await start_all_a2a_servers()
+    # Serve "/" right away; "/ready" stays unavailable until warm-up completes.
+    warmup_task = asyncio.create_task(warm_up())
     yield
+    warmup_task.cancel()
     print("Application shutdown: Cleaning up MCP servers...")
     await stop_mcp_servers()
     await stop_all_a2a_servers()
+    # After the A2A servers so writes accepted during their shutdown are flushed too.
+    await stop_write_behind()
 
-app = FastAPI(lifespan=lifespan) # Apply the lifespan manager
+app = FastAPI(lifespan=lifespan, default_response_class=FastORJSONResponse) # Apply the lifespan manager
+
+# Only bodies above this size are worth the compression CPU.
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
 
 origins = [
     "http://localhost:8080",
@@ -36,12 +62,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_BYTES, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
 
 class UserQuery(BaseModel):
     message: str
+    # Optional: pass the same id on every turn to keep server-side conversation history.
+    session_id: str | None = None
 
 class Answer(BaseModel):
-    response: str | dict
+    response: str
+    session_id: str | None = None
+    usage: dict | None = None
 
 @app.post("/ask", response_model=Answer)
 async def ask(message: UserQuery):
@@ -57,18 +92,26 @@ async def ask(message: UserQuery):
         # If you needed streaming, you'd use primary_agent.run_stream()
         # and return a StreamingResponse from FastAPI
         print(f"Message passed to orchestrator: {message.message}") # Added log for clarity
-        result = await orchestrator.run(message.message, deps=message.message)
+        # Token and tool-call usage of every agent run below is charged to this request.
+        with usage_ledger() as ledger:
+            if message.session_id:
+                store = get_conversation_store()
+                session = store.get(message.session_id)
+                # Turns of one session are serialized so each sees the previous one's history.
+                async with session.lock:
+                    result = await orchestrator.run(message.message, deps=message.message, message_history=session.messages)
+                    store.save(session, await store.compact(session, result.all_messages()))
+            else:
+                result = await orchestrator.run(message.message, deps=message.message)
         print(f"Orchestrator agent response: {result}")
-        response_data = result.output if result.output is not None else "Agent did not return data."
+        response_data = str(result.output) if result.output is not None else "Agent did not return data."
 
-        # If the agent returns a dict (e.g., from a tool call),
-        # ensure it's handled correctly. For now, we wrap it.
-        # You might want more specific handling based on expected agent output.
-        if isinstance(response_data, dict):
-             return Answer(response=response_data)
-        else:
-             return Answer(response=str(response_data))
+        # Returning a Response directly skips FastAPI's response_model re-validation.
+        return build_response(response_data, {"session_id": message.session_id, "usage": ledger.summary()})
 
+    except UsageLimitExceeded as e:
+        print(f"Request stopped by usage limit: {e}")
+        raise HTTPException(status_code=429, detail=f"Usage limit exceeded: {str(e)}")
     except Exception as e:
         print(f"Error processing request with orchestrator: {e}")
         # Consider more specific error handling based on potential agent errors
@@ -83,6 +126,46 @@ async def root():
     """
     return {"message": "Orchestration API is running"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness check: succeeds only once the startup warm-up phase has finished.
+    """
+    if not is_ready():
+        return FastORJSONResponse(status_code=503, content=warmup_status())
+    return warmup_status()
+
+@app.get("/stats/llm-cache")
+async def llm_cache_stats():
+    """
+    Hit/miss and saved-token counters for the persistent LLM cache.
+    """
+    return get_cache_stats()
+
+@app.get("/stats/usage")
+async def usage_stats():
+    """
+    Token usage and tool calls since startup, rolled up per agent and per model.
+    """
+    return usage_rollups()
+
+@app.get("/stats/llm-latency")
+async def llm_latency_stats():
+    """
+    Observed LLM latency percentiles per model endpoint, which drive request hedging.
+    """
+    return latency_stats()
+
+@app.get("/writes/{write_id}")
+async def write_status(write_id: str):
+    """
+    Status (pending or flushed) of a write acknowledged in write-behind mode.
+    """
+    status = get_write_status(write_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown write id")
+    return status
+
 # Note: If you run this with uvicorn, use --reload carefully during development,
 # as the MCP server processes might not restart cleanly every time.
 
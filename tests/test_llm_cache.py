@@ -0,0 +1,73 @@
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agents import llm_cache
+from agents.llm_cache import CachedModel, LLMCache
+
+
+def make_agent(cache: LLMCache):
+    calls = []
+
+    def answer(messages, info: AgentInfo) -> ModelResponse:
+        calls.append(messages)
+        return ModelResponse(parts=[TextPart(f"answer {len(calls)}")])
+
+    return Agent(CachedModel(FunctionModel(answer), cache)), calls
+
+
+def test_repeated_request_is_served_from_cache(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"))
+    agent, calls = make_agent(cache)
+
+    first = agent.run_sync("classify this")
+    second = agent.run_sync("classify this")
+
+    assert len(calls) == 1
+    assert first.output == second.output == "answer 1"
+    assert first.usage().total_tokens
+    assert not second.usage().total_tokens
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_different_prompt_misses(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"))
+    agent, calls = make_agent(cache)
+
+    agent.run_sync("classify this")
+    result = agent.run_sync("classify that")
+
+    assert len(calls) == 2
+    assert result.output == "answer 2"
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 2
+
+
+def test_expired_entry_misses(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"), ttl=-1)
+    agent, calls = make_agent(cache)
+
+    agent.run_sync("classify this")
+    agent.run_sync("classify this")
+
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 0
+
+
+def test_cache_is_opened_on_first_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_llm_cache", None)
+    opened = []
+
+    def get_llm_cache():
+        opened.append(True)
+        return LLMCache(str(tmp_path / "cache.sqlite"))
+
+    monkeypatch.setattr(llm_cache, "get_llm_cache", get_llm_cache)
+    agent = Agent(CachedModel(FunctionModel(lambda messages, info: ModelResponse(parts=[TextPart("ok")]))))
+    assert not opened
+
+    agent.run_sync("hello")
+    agent.run_sync("hello")
+    assert opened == [True]
@@ -0,0 +1,130 @@
+import threading
+
+from notes_index import NotesIndex, index_notes_directory
+from notes_index.extraction import extract_chunks, extract_terms
+
+NOTE = """#ideas #Garden
+Tomatoes want sun. Tomatoes want water. Tomatoes want patience.
+Basil grows next to the tomatoes, and a single marigold keeps the aphids away.
+"""
+
+
+def make_index(tmp_path):
+    return NotesIndex(str(tmp_path / "notes_index.sqlite"))
+
+
+def test_extract_terms_skips_stopwords_and_hashtags():
+    terms = extract_terms("#garden The tomatoes and the basil, then the tomatoes again")
+    assert terms == ["basil", "tomatoes"]
+
+
+def test_every_word_of_a_chunk_is_indexed():
+    chunk = extract_chunks(NOTE)[0]
+    assert chunk.hashtags == ["garden", "ideas"]
+    assert "marigold" in chunk.keywords
+    assert "aphids" in chunk.keywords
+
+
+def test_lookup_by_hashtag_and_rare_keyword(tmp_path):
+    index = make_index(tmp_path)
+    assert index.upsert_document("note:garden.md", NOTE)
+
+    assert index.lookup("#Garden") == {"note:garden.md": ["note:garden.md#0"]}
+    assert index.lookup("marigold") == {"note:garden.md": ["note:garden.md#0"]}
+    assert index.lookup("marigold", kind="hashtag") == {}
+    assert index.hashtags() == {"garden": 1, "ideas": 1}
+    assert index.document_ideas("note:garden.md")[0] == "tomatoes"
+
+
+def test_search_all_and_any(tmp_path):
+    index = make_index(tmp_path)
+    index.upsert_document("a", "tomatoes and basil")
+    index.upsert_document("b", "tomatoes and peppers")
+
+    assert set(index.search(["tomatoes", "basil"])) == {"a"}
+    assert set(index.search(["basil", "peppers"], match_all=False)) == {"a", "b"}
+    assert index.search([]) == {}
+
+
+def test_search_orders_chunks_numerically(tmp_path, monkeypatch):
+    from notes_index import extraction
+    split_chunks = extraction.split_chunks
+    monkeypatch.setattr(extraction, "split_chunks", lambda text: split_chunks(text, size=2, overlap=0))
+    index = make_index(tmp_path)
+    index.upsert_document("a", " ".join(["tomatoes basil"] * 12))
+
+    expected = [f"a#{i}" for i in range(12)]
+    assert index.lookup("tomatoes")["a"] == expected
+    assert index.search(["tomatoes", "basil"])["a"] == expected
+
+
+def test_unchanged_document_is_skipped_and_changed_one_replaced(tmp_path):
+    index = make_index(tmp_path)
+    assert index.upsert_document("a", "tomatoes and basil")
+    assert not index.upsert_document("a", "tomatoes and basil")
+
+    assert index.upsert_document("a", "peppers only")
+    assert index.lookup("basil") == {}
+    assert set(index.lookup("peppers")) == {"a"}
+
+
+def test_remove_document(tmp_path):
+    index = make_index(tmp_path)
+    index.upsert_document("a", "#garden tomatoes")
+    index.upsert_document("b", "#garden basil")
+    index.remove_document("a")
+
+    assert index.lookup("tomatoes") == {}
+    assert index.hashtags() == {"garden": 1}
+    assert index.document_ids() == ["b"]
+
+
+def test_index_survives_reopening(tmp_path):
+    index = make_index(tmp_path)
+    index.upsert_document("a", NOTE, source="transcript")
+
+    reopened = make_index(tmp_path)
+    assert reopened.lookup("marigold") == index.lookup("marigold")
+    assert reopened.document_ids(source="transcript") == ["a"]
+    assert not reopened.upsert_document("a", NOTE, source="transcript")
+    reopened.remove_document("a")
+    assert reopened.lookup("marigold") == {}
+
+
+def test_index_notes_directory_drops_deleted_notes(tmp_path):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "garden.md").write_text(NOTE)
+    (notes / "todo.txt").write_text("buy compost")
+    (notes / "image.png").write_bytes(b"\x89PNG")
+    index = make_index(tmp_path)
+
+    assert sorted(index_notes_directory(str(notes), index)) == ["note:garden.md", "note:todo.txt"]
+    assert index_notes_directory(str(notes), index) == []
+
+    (notes / "todo.txt").unlink()
+    index_notes_directory(str(notes), index)
+    assert index.document_ids(source="note") == ["note:garden.md"]
+    assert index.lookup("compost") == {}
+
+
+def test_reads_while_another_thread_indexes(tmp_path):
+    index = make_index(tmp_path)
+    errors = []
+
+    def write():
+        try:
+            for i in range(200):
+                index.upsert_document(f"doc{i % 20}", f"#tag{i} tomatoes word{i} basil{i}")
+        except Exception as e:
+            errors.append(e)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while writer.is_alive():
+        index.search(["tomatoes"])
+        index.hashtags()
+    writer.join()
+
+    assert not errors
+    assert len(index.lookup("tomatoes")) == 20
@@ -0,0 +1,169 @@
+import json
+import asyncio
+
+import pytest
+
+from agents.supabase import write_behind
+from agents.supabase.write_behind import FLUSHED, PENDING, WriteBehindQueue
+
+
+class FakeUpserts:
+    """Rows upserted through the patched run_query, which fails when fail_when(rows) is true."""
+
+    def __init__(self):
+        self.upserted = []
+        self.fail_when = lambda rows: False
+
+
+class FakeClient:
+    """Just enough of the Supabase client for db.table(t).upsert(rows).execute()."""
+
+    def table(self, name):
+        return self
+
+    def upsert(self, rows):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        return self.rows
+
+
+@pytest.fixture
+def upserts(monkeypatch):
+    fake = FakeUpserts()
+
+    async def run_query(build, retry=False):
+        rows = build(FakeClient())
+        if fake.fail_when(rows):
+            raise TimeoutError("supabase unavailable")
+        fake.upserted.extend(rows)
+
+    monkeypatch.setattr(write_behind, "run_query", run_query)
+    return fake
+
+
+def read_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def make_queue(tmp_path, **kwargs):
+    # A long flush interval keeps the periodic flush out of the way; tests flush explicitly.
+    return WriteBehindQueue(log_path=str(tmp_path / "write_behind.log"), flush_interval=3600, **kwargs)
+
+
+def test_replay_skips_flushed_but_keeps_failed_writes(tmp_path, upserts):
+    log_path = tmp_path / "write_behind.log"
+    records = [
+        {"op": "write", "id": "a", "table": "notes", "row": {"id": 1, "text": "a"}},
+        {"op": "write", "id": "b", "table": "notes", "row": {"id": 2, "text": "b"}},
+        {"op": "flushed", "ids": ["a"]},
+        {"op": "failed", "ids": ["b"], "error": "timeout"},
+    ]
+    log_path.write_text("".join(json.dumps(r) + "\n" for r in records) + '{"op": "wri')
+
+    async def scenario():
+        queue = make_queue(tmp_path)
+        await queue.start()
+        assert queue.status("b")["status"] == PENDING
+        assert queue.status("a") is None
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert upserts.upserted == [{"id": 2, "text": "b"}]
+    assert queue.status("b")["status"] == FLUSHED
+    assert read_log(log_path) == []
+
+
+def test_failed_flush_keeps_rows_and_retries_after_backoff(tmp_path, upserts):
+    upserts.fail_when = lambda rows: True
+
+    async def scenario():
+        queue = make_queue(tmp_path, retry_backoff=3600)
+        write_id = await queue.enqueue("notes", {"id": 1, "text": "hello"})
+        await queue.flush_all()
+        status = queue.status(write_id)
+        assert status["status"] == PENDING
+        assert "unavailable" in status["error"]
+
+        # Still backing off: nothing is attempted.
+        upserts.fail_when = lambda rows: False
+        await queue.flush_all()
+        assert upserts.upserted == []
+
+        queue._retry_at["notes"] = 0
+        await queue.flush_all()
+        assert queue.status(write_id)["status"] == FLUSHED
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert upserts.upserted == [{"id": 1, "text": "hello"}]
+
+
+def test_unflushed_rows_survive_restart(tmp_path, upserts):
+    upserts.fail_when = lambda rows: True
+
+    async def first_run():
+        queue = make_queue(tmp_path)
+        await queue.enqueue("notes", {"id": 1, "text": "hello"})
+        await queue.stop()
+
+    async def second_run():
+        queue = make_queue(tmp_path)
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(first_run())
+    assert [r["op"] for r in read_log(tmp_path / "write_behind.log")] == ["write"]
+
+    upserts.fail_when = lambda rows: False
+    asyncio.run(second_run())
+    assert upserts.upserted == [{"id": 1, "text": "hello"}]
+    assert read_log(tmp_path / "write_behind.log") == []
+
+
+def test_status_is_tracked_per_column_group(tmp_path, upserts):
+    upserts.fail_when = lambda rows: any("category" in row for row in rows)
+
+    async def scenario():
+        queue = make_queue(tmp_path, retry_backoff=3600)
+        plain = await queue.enqueue("notes", {"id": 1, "text": "plain"})
+        tagged = await queue.enqueue("notes", {"id": 2, "text": "tagged", "category": "ideas"})
+        await queue.flush_all()
+        assert queue.status(plain)["status"] == FLUSHED
+        assert queue.status(tagged)["status"] == PENDING
+        assert queue._buffers["notes"] == [(tagged, {"id": 2, "text": "tagged", "category": "ideas"})]
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert upserts.upserted == [{"id": 1, "text": "plain"}]
+
+
+def test_coalesced_writes_settle_together(tmp_path, upserts):
+    async def scenario():
+        queue = make_queue(tmp_path)
+        first = await queue.enqueue("notes", {"id": 1, "text": "draft"})
+        second = await queue.enqueue("notes", {"id": 1, "text": "final"})
+        await queue.flush_all()
+        assert queue.status(first)["status"] == FLUSHED
+        assert queue.status(second)["status"] == FLUSHED
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert upserts.upserted == [{"id": 1, "text": "final"}]
+
+
+def test_partial_writes_to_the_same_row_are_merged(tmp_path, upserts):
+    async def scenario():
+        queue = make_queue(tmp_path)
+        first = await queue.enqueue("notes", {"id": 1, "title": "x", "status": "open"})
+        second = await queue.enqueue("notes", {"id": 1, "status": "done"})
+        await queue.flush_all()
+        assert queue.status(first)["status"] == FLUSHED
+        assert queue.status(second)["status"] == FLUSHED
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert upserts.upserted == [{"id": 1, "title": "x", "status": "done"}]
@@ -0,0 +1,43 @@
+"""
+Fast response serialization for the API tier.
+
+Payloads are encoded with orjson straight from already-validated models, so
+responses are not validated a second time on the way out.
+"""
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # Already validated upstream; dump without re-running validators.
+        return obj.model_dump(mode="python")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also understands pydantic models nested in the content."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def build_response(payload: Any, extra: Optional[dict] = None) -> FastORJSONResponse:
+    """
+    Encode a response body with orjson.
+
+    Args:
+        payload: The value to send as the ``response`` field.
+        extra: Additional top-level fields for the body.
+
+    Returns:
+        A response whose body is already serialized; FastAPI will not re-validate it.
+    """
+    return FastORJSONResponse(content={"response": payload, **(extra or {})})
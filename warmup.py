@@ -0,0 +1,109 @@
+"""
+Startup warm-up and readiness gating.
+
+The lifespan starts ``warm_up`` in the background. It primes the paths the
+first request would otherwise pay for: the LLM provider connection, the A2A
+agent cards and routing context, the Supabase client and the generated table
+models. ``/`` answers as soon as the process is up, while ``/ready`` only
+succeeds once warm-up has finished, so load balancers keep traffic away from
+cold instances.
+"""
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+import httpx
+
+from agent_registry import registry
+from agents.shared import get_main_provider
+from agents.supabase.supabase_client import get_async_supabase_client, run_query
+from agents.supabase.schema_inspector import fetch_table_schema
+from models.model_generator import get_or_create_model
+from notes_index import index_notes_directory
+from routing_context import refresh_routing_context
+
+# Tables whose validation models are generated up front.
+WARMUP_TABLES = [t.strip() for t in os.getenv("WARMUP_TABLES", "categories").split(",") if t.strip()]
+# Notes directory brought up to date in the notes index at startup (optional).
+NOTES_DIR = os.getenv("NOTES_DIR")
+# How long to wait for the in-process A2A servers to start listening.
+WARMUP_A2A_TIMEOUT = float(os.getenv("WARMUP_A2A_TIMEOUT", "15"))
+
+_ready = asyncio.Event()
+_steps: Dict[str, dict] = {}
+
+
+async def _warm_llm_provider() -> None:
+    # Any authenticated call opens the pooled TLS connection shared by all agents.
+    await get_main_provider().client.models.list()
+
+
+async def _warm_agent_cards() -> None:
+    deadline = time.monotonic() + WARMUP_A2A_TIMEOUT
+    async with httpx.AsyncClient() as client:
+        for entry in registry.values():
+            url = f'http://localhost:{entry["PORT"]}/.well-known/agent.json'
+            while True:
+                try:
+                    if (await client.get(url)).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Agent card at {url} not available after {WARMUP_A2A_TIMEOUT}s")
+                await asyncio.sleep(0.2)
+    await refresh_routing_context()
+
+
+async def _warm_supabase() -> None:
+    await get_async_supabase_client()
+    await run_query(lambda db: db.table("categories").select("name").limit(1).execute(), retry=True)
+
+
+async def _warm_table_models() -> None:
+    for table in WARMUP_TABLES:
+        get_or_create_model(table, fetch_table_schema(table))
+
+
+async def _warm_notes_index() -> None:
+    # Only new or changed notes are re-extracted, so this is cheap after the first run.
+    await asyncio.to_thread(index_notes_directory, NOTES_DIR)
+
+
+WARMUP_STEPS: Dict[str, Callable[[], Awaitable[None]]] = {
+    "llm_provider": _warm_llm_provider,
+    "agent_cards": _warm_agent_cards,
+    "supabase": _warm_supabase,
+    "table_models": _warm_table_models,
+}
+if NOTES_DIR:
+    WARMUP_STEPS["notes_index"] = _warm_notes_index
+
+
+async def _run_step(name: str, step: Callable[[], Awaitable[None]]) -> None:
+    started = time.monotonic()
+    try:
+        await step()
+        _steps[name] = {"ok": True, "seconds": round(time.monotonic() - started, 3), "error": None}
+    except Exception as e:
+        # A failed step is reported but does not hold readiness back forever;
+        # the request path will retry it lazily.
+        _steps[name] = {"ok": False, "seconds": round(time.monotonic() - started, 3), "error": str(e)}
+        print(f"Warm-up step {name} failed: {e}")
+
+
+async def warm_up() -> None:
+    """Runs every warm-up step concurrently, then marks the instance ready."""
+    print("Warming up...")
+    await asyncio.gather(*(_run_step(name, step) for name, step in WARMUP_STEPS.items()))
+    _ready.set()
+    print(f"Warm-up finished: {_steps}")
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def warmup_status() -> dict:
+    return {"ready": is_ready(), "steps": dict(_steps)}